@@ -0,0 +1,289 @@
+"""
+Benchmark suite for the giraffe building blocks.
+
+Each benchmark is run at increasing sizes so scaling problems show up, the
+LLM is replaced by ``FakeLLM`` so the agent loop can be measured offline:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.2
+    python benchmark.py --only graph,pubsub --sizes 10,100
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Any, Callable, Literal
+
+from completions import function_call_message
+from fake_llm import FakeLLM, constant
+
+# A benchmark receives a size and returns the operation to time together with
+# the number of operations it performs.
+Setup = Callable[[int], tuple[Callable[[], Any], int]]
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+
+def bench_graph_add_edge(size: int) -> tuple[Callable[[], Any], int]:
+    from graph import DecisionNode, Edge, Graph
+
+    def run() -> None:
+        graph = Graph()
+        for i in range(size):
+            graph.add_node(DecisionNode(id=f"n{i}"))
+        for i in range(size - 1):
+            graph.add_edge(Edge(source=f"n{i}", target=f"n{i + 1}"))
+
+    return run, size - 1
+
+
+def bench_graph_execute(size: int) -> tuple[Callable[[], Any], int]:
+    from graph import DecisionNode, Edge, Graph
+
+    graph = Graph()
+    for i in range(size):
+        graph.add_node(DecisionNode(id=f"n{i}"))
+    for i in range(size - 1):
+        graph.add_edge(Edge(source=f"n{i}", target=f"n{i + 1}"))
+    return lambda: graph.execute("n0"), size
+
+
+def bench_graph_execute_dataflow(size: int) -> tuple[Callable[[], Any], int]:
+    from graph import Edge, Graph, MathNode
+
+    graph = Graph().add_node(MathNode("n0", "1"))
+    for i in range(1, size):
+        graph.add_node(MathNode(f"n{i}", f"n{i - 1} + 1"))
+        graph.add_edge(Edge(source=f"n{i - 1}", target=f"n{i}"))
+    graph.execute_dataflow()
+    last = graph.nodes[f"n{size - 1}"]
+    runs = iter(range(2, 1 << 62))
+
+    def run() -> None:
+        # A new tail expression every run, so only the tail node misses the cache
+        last.value = f"n{size - 2} + {next(runs)}"
+        graph.execute_dataflow()
+
+    return run, size
+
+
+def bench_state_machine_on_event(size: int) -> tuple[Callable[[], Any], int]:
+    from state_machine import State, StateMachine
+
+    class BenchState(State):
+        def on_event(self, event: str) -> State:
+            return self
+
+    states = [BenchState(id=f"s{i}") for i in range(size)]
+    machine = StateMachine(states[0])
+    for i, state in enumerate(states):
+        machine.add_transition(state, "next", states[(i + 1) % size])
+
+    def run() -> None:
+        for _ in range(size):
+            machine.on_event("next")
+
+    return run, size
+
+
+def bench_pubsub_publish(size: int) -> tuple[Callable[[], Any], int]:
+    from pubsub import Pubsub
+
+    received: list[Any] = []
+    pubsub = Pubsub()
+    for _ in range(size):
+        pubsub.subscribe("event", received.append)
+
+    def run() -> None:
+        received.clear()
+        pubsub.publish("event", {"key": "value"})
+
+    return run, size
+
+
+def bench_toolbox_get_tool(size: int) -> tuple[Callable[[], Any], int]:
+    from tools import Tool, Toolbox
+
+    def noop() -> None:
+        pass
+
+    toolbox = Toolbox()
+    for i in range(size):
+        tool = Tool(noop, {"type": "function", "function": {"name": f"tool_{i}"}})
+        tool.name = f"tool_{i}"
+        toolbox.add_tool(tool)
+    names = [f"tool_{i}" for i in range(size)]
+
+    def run() -> None:
+        for name in names:
+            toolbox.get_tool(name)
+
+    return run, size
+
+
+def bench_generate_schema(size: int) -> tuple[Callable[[], Any], int]:
+    from tools import generate_schema
+
+    def example(location: str, format: Literal["celsius", "fahrenheit"] = "celsius", days: int = 1) -> str:
+        """
+        Get the current weather.
+
+        location: The city and state, e.g. San Francisco, CA
+        format: The temperature unit to use.
+        days: Number of days to forecast.
+        """
+        return location
+
+    def run() -> None:
+        for _ in range(size):
+            generate_schema(example)
+
+    return run, size
+
+
+def bench_workflow_agent_step(size: int) -> tuple[Callable[[], Any], int]:
+    from workflow_builder import WorkflowAgentBuilder
+
+    def reply(request: dict[str, Any]) -> Any:
+        name = request["function_call"]["name"]
+        if name == "FunctionDefinition":
+            return function_call_message(name, {
+                "thinking": "",
+                "function_name": "advance",
+                "function_description": "Advance the workflow.",
+                "argument_description": "Anything.",
+            })
+        return function_call_message(name, {"thinking": "", "action": "advance", "argument": "x"})
+
+    def advance(argument: str) -> str:
+        return f"advanced {argument}"
+
+    # Fixed token counts; estimating them serializes the whole history per
+    # request, which would make this measure the stub instead of the agent.
+    llm = FakeLLM([reply], cycle=True, prompt_tokens=constant(500), completion_tokens=constant(50))
+    agent = (
+        WorkflowAgentBuilder()
+        .add_llm(llm, "fake")
+        .add_system_message("Benchmark the agent loop.")
+        .add_state_and_transitions("INIT", {advance})
+        .build()
+    )
+
+    def run() -> None:
+        for _ in range(size):
+            agent.step()
+
+    return run, size
+
+
+BENCHMARKS: dict[str, Setup] = {
+    "graph.add_edge": bench_graph_add_edge,
+    "graph.execute": bench_graph_execute,
+    "graph.execute_dataflow": bench_graph_execute_dataflow,
+    "state_machine.on_event": bench_state_machine_on_event,
+    "pubsub.publish": bench_pubsub_publish,
+    "tools.get_tool": bench_toolbox_get_tool,
+    "tools.generate_schema": bench_generate_schema,
+    "workflow_agent.step": bench_workflow_agent_step,
+}
+
+
+def measure(setup: Setup, size: int, repeat: int) -> dict[str, Any]:
+    """
+    Time a benchmark at one size.
+
+    Args:
+        setup: The benchmark to run.
+        size: The size to run it at.
+        repeat: How many times to time the operation.
+    """
+    run, ops = setup(size)
+    timings: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    return {
+        "size": size,
+        "ops": ops,
+        "min_s": min(timings),
+        "median_s": median,
+        "per_op_us": median / max(ops, 1) * 1e6,
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        results: The current results keyed by "name[size]".
+        baseline: The stored results keyed by "name[size]".
+        threshold: The allowed relative slowdown of the median, e.g. 0.2 for 20%.
+
+    Returns:
+        A description of every benchmark that regressed.
+    """
+    regressions: list[str] = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]["median_s"]
+        after = result["median_s"]
+        if before and (after - before) / before > threshold:
+            regressions.append(
+                f"{key}: {before * 1e3:.3f}ms -> {after * 1e3:.3f}ms (+{(after - before) / before:.0%})"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the giraffe benchmark suite.")
+    parser.add_argument("--only", help="Comma separated benchmark names or prefixes, e.g. graph,pubsub.")
+    parser.add_argument("--sizes", help="Comma separated sizes to run at.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timings per benchmark and size.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against results stored in this file.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown.")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit.")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else DEFAULT_SIZES
+    selected = BENCHMARKS
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(","))
+        selected = {name: setup for name, setup in BENCHMARKS.items() if name.startswith(prefixes)}
+
+    results: dict[str, Any] = {}
+    for name, setup in selected.items():
+        for size in sizes:
+            result = measure(setup, size, args.repeat)
+            results[f"{name}[{size}]"] = result
+            print(
+                f"{name:<26} {size:>6}  median {result['median_s'] * 1e3:10.3f}ms"
+                f"  {result['per_op_us']:10.2f}us/op"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Exact-match cache for chat completion requests.
+
+Requests are keyed on a hash of the model, messages, functions, tools and
+the other parameters (see ``completions.request_key``). Lookups go to a
+bounded in-memory LRU first and then, when a path is given, to a SQLite
+file that survives restarts. Cached responses report zero token usage since
+they cost none.
+
+    cache = CompletionCache(max_entries=1024, ttl=3600, path=".completions.sqlite")
+    agent = WorkflowAgentBuilder().add_llm(client, model, cache=cache)...
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from completions import ChatCompletion, CompletionsClient, request_key, to_jsonable
+from log import get_logger
+from telemetry import telemetry
+
+logger = get_logger(__name__)
+
+
+class CacheStats:
+    """
+    Counters of a completion cache.
+    """
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return (
+            f"CacheStats(memory_hits={self.memory_hits}, disk_hits={self.disk_hits}, misses={self.misses}, "
+            f"expired={self.expired}, evictions={self.evictions}, hit_rate={self.hit_rate:.1%})"
+        )
+
+
+class CompletionCache:
+    """
+    Two-tier cache of chat completions: a bounded in-memory LRU and an
+    optional SQLite file.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None, path: str | None = None):
+        """
+        Args:
+            max_entries: The number of responses kept in memory.
+            ttl: Seconds a response stays valid; forever when omitted.
+            path: SQLite file for the persistent tier; memory only when omitted.
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, expires_at REAL, response TEXT)"
+            )
+            self._db.commit()
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Any | None:
+        """
+        Get a cached response.
+
+        Args:
+            key: The request key.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    telemetry.count("completion_cache", tier="memory", result="hit")
+                    return response
+                del self._memory[key]
+                self.stats.expired += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires_at, response FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    expires_at, payload = row
+                    if expires_at is None or expires_at > now:
+                        response = ChatCompletion.model_validate(json.loads(payload))
+                        self._remember(key, expires_at, response)
+                        self.stats.disk_hits += 1
+                        telemetry.count("completion_cache", tier="disk", result="hit")
+                        return response
+                    self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.stats.expired += 1
+
+            self.stats.misses += 1
+            telemetry.count("completion_cache", tier="none", result="miss")
+            return None
+
+    def put(self, key: str, response: Any) -> Any:
+        """
+        Store a response and return the cached copy, which reports no token usage.
+
+        Args:
+            key: The request key.
+            response: The response to store.
+        """
+        cached = _without_usage(response)
+        expires_at = time.time() + self._ttl if self._ttl is not None else None
+        with self._lock:
+            self._remember(key, expires_at, cached)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions (key, expires_at, response) VALUES (?, ?, ?)",
+                    (key, expires_at, json.dumps(to_jsonable(cached), default=str)),
+                )
+                self._db.commit()
+        return cached
+
+    def clear(self) -> None:
+        """
+        Drop every cached response from both tiers.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM completions")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _remember(self, key: str, expires_at: float | None, response: Any) -> None:
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+            self.stats.evictions += 1
+
+
+def _without_usage(response: Any) -> Any:
+    usage = getattr(response, "usage", None)
+    if usage is None or not hasattr(response, "model_copy"):
+        return response
+    zero = usage.model_copy(update={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0})
+    return response.model_copy(update={"usage": zero})
+
+
+class CachingClient(CompletionsClient):
+    """
+    Client wrapper answering repeated requests from a ``CompletionCache``.
+    Streaming requests are passed through.
+    """
+    def __init__(self, client: Any, cache: CompletionCache):
+        """
+        Args:
+            client: The client to forward cache misses to.
+            cache: The cache to use.
+        """
+        super().__init__()
+        self._client = client
+        self.cache = cache
+
+    def create(self, **kwargs: Any) -> Any:
+        if kwargs.get("stream"):
+            return self._client.chat.completions.create(**kwargs)
+        key = request_key(kwargs)
+        response = self.cache.get(key)
+        if response is not None:
+            logger.debug("completion cache hit %s", key[:12])
+            return response
+        response = self._client.chat.completions.create(**kwargs)
+        self.cache.put(key, response)
+        return response
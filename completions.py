@@ -0,0 +1,169 @@
+"""
+Lightweight chat-completion types shared by the offline client, the
+record/replay cassettes and the client wrappers.
+
+The models mirror the subset of the OpenAI ``ChatCompletion`` shape the
+workflow code reads (``choices[0].message``, ``function_call``,
+``tool_calls`` and ``usage``) so they can stand in for SDK responses without
+importing the SDK.
+"""
+import hashlib
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+
+class _Model(BaseModel):
+    class Config:
+        # Keep fields we do not model so replayed responses match recorded ones
+        extra = 'allow'
+
+
+class FunctionCall(_Model):
+    name: str
+    arguments: str
+
+
+class ToolCall(_Model):
+    id: str
+    type: str = "function"
+    function: FunctionCall
+
+
+class Message(_Model):
+    role: str = "assistant"
+    content: str | None = None
+    function_call: FunctionCall | None = None
+    tool_calls: list[ToolCall] | None = None
+
+
+class Choice(_Model):
+    index: int = 0
+    message: Message
+    finish_reason: str = "stop"
+
+
+class Usage(_Model):
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
+class ChatCompletion(_Model):
+    id: str
+    object: str = "chat.completion"
+    created: int
+    model: str
+    choices: list[Choice]
+    usage: Usage | None = None
+
+
+def text_message(content: str) -> Message:
+    """
+    Build an assistant message with plain text content.
+    """
+    return Message(content=content)
+
+
+def function_call_message(name: str, arguments: dict[str, Any]) -> Message:
+    """
+    Build an assistant message calling a (legacy) function.
+
+    Args:
+        name: The name of the function.
+        arguments: The arguments, serialized to JSON.
+    """
+    return Message(function_call=FunctionCall(name=name, arguments=json.dumps(arguments)))
+
+
+def tool_calls_message(calls: list[tuple[str, dict[str, Any]]]) -> Message:
+    """
+    Build an assistant message calling one or more tools.
+
+    Args:
+        calls: The (name, arguments) of each tool call.
+    """
+    return Message(
+        tool_calls=[
+            ToolCall(id=f"call_{uuid.uuid4().hex[:24]}", function=FunctionCall(name=name, arguments=json.dumps(args)))
+            for name, args in calls
+        ]
+    )
+
+
+def completion(model: str, message: Message, prompt_tokens: int = 0, completion_tokens: int = 0) -> ChatCompletion:
+    """
+    Wrap a message into a chat completion with usage.
+    """
+    return ChatCompletion(
+        id=f"chatcmpl-{uuid.uuid4().hex}",
+        created=int(time.time()),
+        model=model,
+        choices=[Choice(message=message, finish_reason="function_call" if message.function_call else "stop")],
+        usage=Usage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+    )
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Convert a request or response, including pydantic models such as SDK
+    messages that were appended to a conversation, to plain JSON values.
+    """
+    if isinstance(value, BaseModel):
+        return to_jsonable(value.model_dump(exclude_none=True))
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}  # type: ignore
+    if isinstance(value, (list, tuple, set)):
+        return [to_jsonable(v) for v in value]  # type: ignore
+    return value
+
+
+# Parameters that change how a request is sent but not what is answered
+_TRANSPORT_PARAMS = {"timeout", "extra_headers"}
+
+
+def request_key(request: dict[str, Any]) -> str:
+    """
+    Stable hash of a chat completion request (model, messages, functions,
+    tools and the remaining parameters).
+
+    Args:
+        request: The keyword arguments passed to ``chat.completions.create``.
+    """
+    request = {k: v for k, v in request.items() if k not in _TRANSPORT_PARAMS}
+    payload = json.dumps(to_jsonable(request), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class _Completions:
+    def __init__(self, create: Callable[..., Any]):
+        self.create = create
+
+
+class _Chat:
+    def __init__(self, create: Callable[..., Any]):
+        self.completions = _Completions(create)
+
+
+class CompletionsClient(ABC):
+    """
+    Base class for objects that can be used wherever an OpenAI client is
+    expected, i.e. they expose ``client.chat.completions.create(**kwargs)``.
+    """
+    def __init__(self):
+        self.chat = _Chat(self.create)
+
+    @abstractmethod
+    def create(self, **kwargs: Any) -> Any:
+        """
+        Create a chat completion.
+        """
+        pass
@@ -0,0 +1,189 @@
+"""
+Deterministic offline stand-ins for the OpenAI chat completions client.
+
+``FakeLLM`` answers from a script with configurable latency and token usage,
+``RecordingClient`` writes the requests and responses of a real client to a
+JSONL cassette and ``ReplayClient`` plays a cassette back without network:
+
+    recorder = RecordingClient(OpenAI(), "memory_game.jsonl")
+    ...
+    agent = builder.add_llm(ReplayClient("memory_game.jsonl"), model).build()
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Iterable
+
+from completions import ChatCompletion, CompletionsClient, Message, completion, request_key, to_jsonable
+
+Distribution = Callable[[random.Random], float]
+Reply = Message | Callable[[dict[str, Any]], Message]
+
+
+def constant(value: float) -> Distribution:
+    """
+    Always return the same value.
+    """
+    return lambda rng: value
+
+
+def uniform(low: float, high: float) -> Distribution:
+    """
+    Sample uniformly between low and high.
+    """
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median: float, sigma: float) -> Distribution:
+    """
+    Sample a long-tailed distribution with the given median, which is a good
+    fit for real LLM latencies.
+    """
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def estimate_tokens(value: Any) -> int:
+    """
+    Rough token count of a request or message (four characters per token).
+    """
+    return max(1, len(json.dumps(to_jsonable(value), default=str)) // 4)
+
+
+class FakeLLM(CompletionsClient):
+    """
+    A scripted chat completions client.
+
+    Each request consumes the next reply of the script. A reply is either a
+    ``Message`` or a callable receiving the request keyword arguments and
+    returning one, e.g. to answer based on the offered functions. A request
+    with a ``timeout`` shorter than the sampled latency waits for the timeout
+    and raises ``TimeoutError`` like a real client would.
+    """
+    def __init__(
+        self,
+        script: Iterable[Reply],
+        cycle: bool = False,
+        latency: float | Distribution = 0.0,
+        prompt_tokens: Distribution | None = None,
+        completion_tokens: Distribution | None = None,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            script: The replies to return, in order.
+            cycle: Start again from the beginning when the script runs out.
+            latency: Seconds to wait before answering, or a distribution.
+            prompt_tokens: Distribution of prompt tokens; estimated from the request when omitted.
+            completion_tokens: Distribution of completion tokens; estimated from the reply when omitted.
+            seed: Seed for the distributions so runs are reproducible.
+        """
+        super().__init__()
+        self._script: list[Reply] = list(script)
+        self._cycle = cycle
+        self._latency = latency if callable(latency) else constant(latency)
+        self._prompt_tokens = prompt_tokens
+        self._completion_tokens = completion_tokens
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._position = 0
+        self.requests: list[dict[str, Any]] = []
+
+    def _next_reply(self, request: dict[str, Any]) -> tuple[Reply, float, int | None, int | None]:
+        with self._lock:
+            if self._position >= len(self._script):
+                if not self._cycle or not self._script:
+                    raise IndexError(f"FakeLLM script exhausted after {self._position} requests")
+                self._position = 0
+            reply = self._script[self._position]
+            self._position += 1
+            self.requests.append(request)
+            latency = self._latency(self._rng)
+            prompt = round(self._prompt_tokens(self._rng)) if self._prompt_tokens else None
+            done = round(self._completion_tokens(self._rng)) if self._completion_tokens else None
+        return reply, latency, prompt, done
+
+    def create(self, **kwargs: Any) -> ChatCompletion:
+        reply, latency, prompt_tokens, completion_tokens = self._next_reply(kwargs)
+        timeout = kwargs.get("timeout")
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Request timed out after {timeout}s")
+        message = reply(kwargs) if callable(reply) else reply
+        if latency > 0:
+            time.sleep(latency)
+        return completion(
+            model=kwargs.get("model", ""),
+            message=message,
+            prompt_tokens=prompt_tokens if prompt_tokens is not None else estimate_tokens(kwargs.get("messages", [])),
+            completion_tokens=completion_tokens if completion_tokens is not None else estimate_tokens(message),
+        )
+
+
+class RecordingClient(CompletionsClient):
+    """
+    Forward requests to a real client and append every request and response
+    to a JSONL cassette.
+    """
+    def __init__(self, client: Any, path: str):
+        """
+        Args:
+            client: The client to forward requests to.
+            path: The cassette file to append to.
+        """
+        super().__init__()
+        self._client = client
+        self._path = path
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs: Any) -> Any:
+        response = self._client.chat.completions.create(**kwargs)
+        entry = {
+            "key": request_key(kwargs),
+            "request": to_jsonable(kwargs),
+            "response": to_jsonable(response),
+        }
+        with self._lock:
+            with open(self._path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        return response
+
+
+class ReplayClient(CompletionsClient):
+    """
+    Answer requests from a cassette written by ``RecordingClient``.
+
+    Identical requests are answered in the order they were recorded. Requests
+    that were never recorded raise a ``KeyError``.
+    """
+    def __init__(self, path: str, latency: float | Distribution = 0.0, seed: int = 0):
+        """
+        Args:
+            path: The cassette file to read.
+            latency: Seconds to wait before answering, or a distribution.
+            seed: Seed for the latency distribution.
+        """
+        super().__init__()
+        self._latency = latency if callable(latency) else constant(latency)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._responses: defaultdict[str, Deque[dict[str, Any]]] = defaultdict(deque)
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._responses[entry["key"]].append(entry["response"])
+
+    def create(self, **kwargs: Any) -> ChatCompletion:
+        key = request_key(kwargs)
+        with self._lock:
+            if not self._responses.get(key):
+                raise KeyError(f"No recorded response for request {key[:12]} (model {kwargs.get('model')})")
+            response = self._responses[key].popleft()
+            latency = self._latency(self._rng)
+        if latency > 0:
+            time.sleep(latency)
+        return ChatCompletion.model_validate(response)
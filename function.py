@@ -3,7 +3,10 @@ import json
 import os
 
 from typing import Any, Callable, TypedDict
-from openai import OpenAI
+
+from log import get_logger
+
+logger = get_logger(__name__)
 
 
 class FunctionDefinition(TypedDict):
@@ -18,9 +21,19 @@ def is_valid_function_definition(data: FunctionDefinition) -> bool:
 
 
 
-def create_definition(func: Callable[[Any, Any], str], goal: str) -> FunctionDefinition:
+def create_definition(func: Callable[[Any, Any], str], goal: str, client: Any = None) -> FunctionDefinition:
+    """
+    Ask the model to describe a transition function.
+
+    Args:
+        func: The function to describe.
+        goal: The goal of the workflow the function is used in.
+        client: The client to use; a default OpenAI client when omitted.
+    """
     source = inspect.getsource(func)
-    client = OpenAI()
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI()
     response = client.chat.completions.create(
         model=os.getenv("OPENAI_MODEL") or "",
         messages=[
@@ -79,7 +92,7 @@ Extract the function metadata.
     )
     msg = response.choices[0].message
     assert msg.function_call
-    print(msg.function_call)
+    logger.debug("%s", msg.function_call)
     args: FunctionDefinition = json.loads(msg.function_call.arguments)
 
     if not is_valid_function_definition(args):
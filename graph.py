@@ -118,26 +118,102 @@
 # # edge_ca = Edge(source="C", target="A")
 # # dag.add_edge(edge_ca)
 
+import ast
+import hashlib
+import inspect
+import operator
+import pickle
+import time
 from abc import ABC, abstractmethod
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Tuple
-from IPython.display import display, Markdown # type: ignore
+from collections import OrderedDict
+from pydantic import BaseModel, Field, PrivateAttr
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, ClassVar, List, Dict, Optional, Tuple
+
+from log import get_logger
+from telemetry import telemetry
+
+logger = get_logger(__name__)
 
 class Node(BaseModel, ABC):
     id: str
     value: Optional[str] = None
 
+    # CPU-bound nodes run in a process pool under execute_dataflow(executor=...)
+    cpu_bound: ClassVar[bool] = False
+
     @abstractmethod
     def decide_next_edge(self, edges: List['Edge']) -> Optional['Edge']:
         pass
 
+    def compute(self, inputs: Dict[str, Any]) -> Any:
+        """
+        Produce the output of the node in dataflow execution from the outputs
+        of its upstream nodes, keyed by node id. Must be deterministic for
+        memoization to be correct; may be async for I/O-bound nodes. Passes
+        the value through by default.
+        """
+        return self.value
+
 class Edge(BaseModel):
     source: str
     target: str
 
+class DataflowStats:
+    """
+    Memoization statistics of dataflow execution.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.last_recomputed: List[str] = []
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return f"DataflowStats(hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.1%})"
+
+
+def _resolve(output: Any) -> Any:
+    """
+    Await the output of an async compute.
+    """
+    if not inspect.isawaitable(output):
+        return output
+    # Only async nodes pay for importing asyncio
+    import asyncio
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(output)  # type: ignore
+    # Called from a running event loop (e.g. a notebook), where asyncio.run
+    # fails: run the coroutine on its own loop in a worker thread.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, output).result()  # type: ignore
+
+
+def _fingerprint(value: Any) -> str:
+    """
+    Hash of a node output, used to key downstream nodes.
+    """
+    try:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        data = repr(value).encode()
+    return hashlib.sha1(data).hexdigest()
+
+
 class Graph(BaseModel):
     nodes: Dict[str, Node] = Field(default_factory=dict)
     edges: List[Edge] = Field(default_factory=list)
+    max_cache_entries: int = 1024
+
+    _dataflow_cache: OrderedDict[str, Tuple[Any, str]] = PrivateAttr(default_factory=OrderedDict)
+    _dataflow_stats: DataflowStats = PrivateAttr(default_factory=DataflowStats)
 
     def add_node(self, node: Node) -> 'Graph':
         if node.id in self.nodes:
@@ -196,18 +272,166 @@ class Graph(BaseModel):
         current_node_id = start_node_id
         while current_node_id:
             current_node = self.nodes[current_node_id]
-            print(f"Executing node {current_node_id}")
-            next_edge = current_node.decide_next_edge([e for e in self.edges if e.source == current_node_id])
+            logger.info("Executing node %s", current_node_id)
+            with telemetry.span("graph.node", node=current_node_id):
+                next_edge = current_node.decide_next_edge([e for e in self.edges if e.source == current_node_id])
             if next_edge:
                 current_node_id = next_edge.target
             else:
                 break
             
+    def topological_order(self) -> List[str]:
+        """
+        The node ids ordered so that every node comes after its upstream nodes.
+        """
+        indegree = {node_id: 0 for node_id in self.nodes}
+        downstream: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+        for edge in self.edges:
+            indegree[edge.target] += 1
+            downstream[edge.source].append(edge.target)
+
+        ready = [node_id for node_id, degree in indegree.items() if degree == 0]
+        order: List[str] = []
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for target in downstream[node_id]:
+                indegree[target] -= 1
+                if indegree[target] == 0:
+                    ready.append(target)
+        if len(order) != len(self.nodes):
+            raise ValueError("Dataflow execution requires an acyclic graph.")
+        return order
+
+    @property
+    def dataflow_stats(self) -> DataflowStats:
+        return self._dataflow_stats
+
+    def clear_dataflow_cache(self) -> None:
+        self._dataflow_cache.clear()
+        self._dataflow_stats = DataflowStats()
+
+    def execute_dataflow(self, executor: Any = None) -> Dict[str, Any]:
+        """
+        Compute every node from the outputs of its upstream nodes.
+
+        Outputs are memoized under a hash of the node id, the node value and
+        the upstream outputs, so after changing a node only the nodes whose
+        inputs actually changed are recomputed.
+
+        Args:
+            executor: A NodeExecutor to run independent nodes in parallel,
+                CPU-bound ones in processes; nodes run inline when omitted.
+
+        Returns:
+            The output of every node keyed by node id.
+        """
+        upstream: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+        downstream: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+        for edge in self.edges:
+            upstream[edge.target].append(edge.source)
+            downstream[edge.source].append(edge.target)
+
+        outputs: Dict[str, Any] = {}
+        fingerprints: Dict[str, str] = {}
+        self._dataflow_stats.last_recomputed = []
+        order = self.topological_order()
+
+        if executor is None:
+            for node_id in order:
+                key, inputs = self._dataflow_inputs(node_id, upstream, outputs, fingerprints)
+                if not self._dataflow_lookup(node_id, key, outputs, fingerprints):
+                    logger.info("Computing node %s", node_id)
+                    with telemetry.span("graph.node", node=node_id):
+                        output = _resolve(self.nodes[node_id].compute(inputs))
+                    self._dataflow_store(node_id, key, output, outputs, fingerprints)
+            return outputs
+
+        waiting = {node_id: len(set(upstream[node_id])) for node_id in order}
+        ready = [node_id for node_id in order if waiting[node_id] == 0]
+        running: Dict[Future[Any], Tuple[str, str, float]] = {}
+
+        def finish(node_id: str) -> None:
+            for target in set(downstream[node_id]):
+                waiting[target] -= 1
+                if waiting[target] == 0:
+                    ready.append(target)
+
+        while ready or running:
+            while ready:
+                node_id = ready.pop(0)
+                key, inputs = self._dataflow_inputs(node_id, upstream, outputs, fingerprints)
+                if self._dataflow_lookup(node_id, key, outputs, fingerprints):
+                    finish(node_id)
+                    continue
+                logger.info("Computing node %s", node_id)
+                running[executor.submit(self.nodes[node_id], inputs)] = (node_id, key, time.perf_counter())
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                node_id, key, started = running.pop(future)
+                telemetry.observe("graph_node", time.perf_counter() - started, node=node_id)
+                self._dataflow_store(node_id, key, future.result(), outputs, fingerprints)
+                finish(node_id)
+        return outputs
+
+    def _dataflow_inputs(
+        self,
+        node_id: str,
+        upstream: Dict[str, List[str]],
+        outputs: Dict[str, Any],
+        fingerprints: Dict[str, str],
+    ) -> Tuple[str, Dict[str, Any]]:
+        node = self.nodes[node_id]
+        sources = sorted(set(upstream[node_id]))
+        key = hashlib.sha1(
+            repr((node_id, type(node).__name__, node.value, [(s, fingerprints[s]) for s in sources])).encode()
+        ).hexdigest()
+        return key, {s: outputs[s] for s in sources}
+
+    def _dataflow_lookup(self, node_id: str, key: str, outputs: Dict[str, Any], fingerprints: Dict[str, str]) -> bool:
+        cached = self._dataflow_cache.get(key)
+        if cached is None:
+            self._dataflow_stats.misses += 1
+            self._dataflow_stats.last_recomputed.append(node_id)
+            telemetry.count("dataflow_cache", result="miss")
+            return False
+        self._dataflow_cache.move_to_end(key)
+        self._dataflow_stats.hits += 1
+        telemetry.count("dataflow_cache", result="hit")
+        outputs[node_id], fingerprints[node_id] = cached
+        return True
+
+    def _dataflow_store(
+        self,
+        node_id: str,
+        key: str,
+        output: Any,
+        outputs: Dict[str, Any],
+        fingerprints: Dict[str, str],
+    ) -> None:
+        outputs[node_id] = output
+        fingerprints[node_id] = _fingerprint(output)
+        self._dataflow_cache[key] = (output, fingerprints[node_id])
+        while len(self._dataflow_cache) > self.max_cache_entries:
+            self._dataflow_cache.popitem(last=False)
+
     def draw_graph(self) -> None:
+        """
+        Render the graph as a mermaid diagram. IPython is only imported here so
+        loading the module does not pay for it; outside a notebook the raw
+        mermaid markdown is printed instead.
+        """
         mermaid_str = "```mermaid\ngraph TD\n"
         for edge in self.edges:
             mermaid_str += f"    {edge.source} --> {edge.target}\n"
         mermaid_str += "```"
+        try:
+            from IPython.display import display, Markdown # type: ignore
+        except ImportError:
+            print(mermaid_str)
+            return
         display(Markdown(mermaid_str))
 
 
@@ -221,8 +445,51 @@ class DecisionNode(Node):
 
 
 class MathNode(Node):
+    """
+    A node whose value is an arithmetic expression over the outputs of its
+    upstream nodes, e.g. MathNode("C", "A * 2 + B").
+    """
     def __init__(self, id: str, value: str):
         super().__init__(id=id, value=value)
 
     def decide_next_edge(self, edges: List[Edge]) -> Optional[Edge]:
-        return edges[0] if edges else None
\ No newline at end of file
+        return edges[0] if edges else None
+
+    def compute(self, inputs: Dict[str, Any]) -> Any:
+        assert self.value is not None, "MathNode needs an expression"
+        return _evaluate(ast.parse(self.value, mode="eval").body, inputs)
+
+
+_BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_UNARY_OPERATORS: Dict[type, Callable[[Any], Any]] = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+
+def _evaluate(node: ast.AST, names: Dict[str, Any]) -> Any:
+    """
+    Evaluate an arithmetic expression without exposing eval().
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in names:
+            raise ValueError(f"Unknown input {node.id}")
+        value = names[node.id]
+        # Upstream outputs may be numeric strings, e.g. node values
+        return float(value) if isinstance(value, str) else value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        return _BINARY_OPERATORS[type(node.op)](_evaluate(node.left, names), _evaluate(node.right, names))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand, names))
+    raise ValueError(f"Unsupported expression {ast.dump(node)}")
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Import-time benchmark for the giraffe modules.
+
+Every module is imported in a fresh interpreter started with
+``python -X importtime`` so the numbers reflect a real cold start. The
+cumulative time of the module itself is reported together with its heaviest
+dependencies, and can be compared against a stored baseline to catch startup
+regressions:
+
+    python import_time.py --output import_times.json
+    python import_time.py --baseline import_times.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any
+
+MODULES = [
+    "function",
+    "graph",
+    "messages",
+    "prompt",
+    "runner",
+    "state_machine",
+    "tools",
+    "workflow_agent",
+    "workflow_builder",
+]
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(output: str) -> dict[str, tuple[int, int]]:
+    """
+    Parse the stderr of ``python -X importtime``.
+
+    Args:
+        output: The raw stderr of the interpreter.
+
+    Returns:
+        A mapping of module name to (self, cumulative) time in microseconds.
+    """
+    timings: dict[str, tuple[int, int]] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            # Header line
+            continue
+        timings[fields[2].strip()] = (self_us, cumulative_us)
+    return timings
+
+
+def measure_import(module: str, runs: int = 5, top: int = 5) -> dict[str, Any]:
+    """
+    Measure the cold import time of a module.
+
+    Args:
+        module: The name of the module to import.
+        runs: The number of fresh interpreters to start; the fastest run wins.
+        top: The number of heaviest dependencies to report.
+    """
+    best: dict[str, tuple[int, int]] | None = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+        timings = parse_importtime(proc.stderr)
+        if best is None or timings[module][1] < best[module][1]:
+            best = timings
+
+    assert best is not None, "runs must be at least 1"
+    heaviest = sorted(
+        ((name, cumulative) for name, (_, cumulative) in best.items() if name != module and "." not in name),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return {
+        "module": module,
+        "cumulative_us": best[module][1],
+        "heaviest": [{"module": name, "cumulative_us": us} for name, us in heaviest],
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """
+    Compare import times against a baseline.
+
+    Args:
+        results: The current results keyed by module.
+        baseline: The stored results keyed by module.
+        threshold: The allowed relative slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        A description of every module that regressed.
+    """
+    regressions: list[str] = []
+    for module, result in results.items():
+        if module not in baseline:
+            continue
+        before = baseline[module]["cumulative_us"]
+        after = result["cumulative_us"]
+        if before and (after - before) / before > threshold:
+            regressions.append(f"{module}: {before}us -> {after}us (+{(after - before) / before:.0%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold import time of the giraffe modules.")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules to measure.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against results stored in this file.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown.")
+    args = parser.parse_args(argv)
+
+    results: dict[str, Any] = {}
+    for module in args.modules:
+        result = measure_import(module, runs=args.runs)
+        results[module] = result
+        deps = ", ".join(f"{d['module']}={d['cumulative_us'] / 1000:.1f}ms" for d in result["heaviest"])
+        print(f"{module:<20} {result['cumulative_us'] / 1000:8.1f}ms  ({deps})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Leveled, non-blocking logging for the giraffe modules.
+
+Like any library, giraffe only attaches a ``NullHandler`` and lets records
+propagate to the application's logging configuration. ``configure()`` takes
+the output over instead: records are put on a queue by the calling thread and
+formatted and written by a background listener, started on the first record,
+so hot paths never block on stdout. Messages use lazy ``%s`` arguments and
+levels are checked before any work is done; with the default WARNING level
+the info and debug calls in the agent loop cost a level check only.
+
+Levels are set in code or through the environment, which also configures
+the output on first use:
+
+    GIRAFFE_LOG_LEVEL=INFO
+    GIRAFFE_LOG_LEVELS=graph=DEBUG,workflow_agent=INFO
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+ROOT_LOGGER = "giraffe"
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_lock = threading.Lock()
+_listener: logging.handlers.QueueListener | None = None
+_listener_started = False
+_initialized = False
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread. The stock
+    handler formats the message in the caller, which is the work we want off
+    the hot path. Records never leave the process, so passing them as-is is
+    safe; arguments should not be mutated after logging.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if not _listener_started:
+            _start_listener()
+        super().enqueue(record)
+
+
+def _start_listener() -> None:
+    global _listener_started
+    with _lock:
+        if _listener is not None and not _listener_started:
+            _listener.start()
+            _listener_started = True
+
+
+def _parse_levels(spec: str) -> dict[str, str]:
+    levels: dict[str, str] = {}
+    for item in spec.split(","):
+        if "=" in item:
+            module, level = item.split("=", 1)
+            levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(
+    level: str | int | None = None,
+    levels: dict[str, str | int] | None = None,
+    handler: logging.Handler | None = None,
+    propagate: bool = False,
+) -> None:
+    """
+    Write the giraffe logs through a background listener. Called on first
+    use when GIRAFFE_LOG_LEVEL or GIRAFFE_LOG_LEVELS is set.
+
+    Args:
+        level: The default level; GIRAFFE_LOG_LEVEL or WARNING when omitted.
+        levels: Levels per module, e.g. {"graph": "DEBUG"}; GIRAFFE_LOG_LEVELS when omitted.
+        handler: Where the listener writes records; stderr when omitted.
+        propagate: Also pass records on to the application's handlers, which
+            format them on the calling thread and print them a second time
+            when the application logs to the console as well.
+    """
+    global _listener, _listener_started
+    with _lock:
+        if _listener_started:
+            _listener.stop()  # type: ignore
+            _listener_started = False
+
+        if handler is None:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+
+        log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        root = logging.getLogger(ROOT_LOGGER)
+        for existing in [h for h in root.handlers if isinstance(h, _DeferredQueueHandler)]:
+            root.removeHandler(existing)
+        root.addHandler(_DeferredQueueHandler(log_queue))
+        root.propagate = propagate
+        root.setLevel(level or os.getenv("GIRAFFE_LOG_LEVEL", "WARNING").upper())
+
+        module_levels = levels if levels is not None else _parse_levels(os.getenv("GIRAFFE_LOG_LEVELS", ""))
+        for module, module_level in module_levels.items():
+            logging.getLogger(f"{ROOT_LOGGER}.{module}").setLevel(module_level)
+
+        # Started by the first record so configuring never costs a thread
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+
+
+def shutdown() -> None:
+    """
+    Flush queued records and stop the background listener.
+    """
+    global _listener, _listener_started
+    with _lock:
+        if _listener_started:
+            _listener.stop()  # type: ignore
+        _listener = None
+        _listener_started = False
+
+
+atexit.register(shutdown)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get the logger of a giraffe module.
+
+    Args:
+        name: The module name, usually ``__name__``.
+    """
+    global _initialized
+    if not _initialized:
+        _initialized = True
+        logging.getLogger(ROOT_LOGGER).addHandler(logging.NullHandler())
+        if os.getenv("GIRAFFE_LOG_LEVEL") or os.getenv("GIRAFFE_LOG_LEVELS"):
+            configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
@@ -0,0 +1,191 @@
+"""
+Parallel execution of graph nodes for ``Graph.execute_dataflow``.
+
+Nodes that declare ``cpu_bound = True`` run in a process pool so they are
+not limited by the GIL; all other nodes run on threads, and nodes with an
+``async def compute`` run on an event loop in a thread. Large inputs and
+outputs of process-pool nodes (bytes, bytearrays and numpy arrays over a
+size threshold) travel through shared memory instead of being pickled
+through a pipe: the parent writes an input once and the worker maps
+arrays without copying (bytes are copied once, being immutable).
+
+    with NodeExecutor(processes=4) as executor:
+        outputs = graph.execute_dataflow(executor=executor)
+"""
+import asyncio
+import inspect
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Tuple
+
+
+class SharedBuffer:
+    """
+    Picklable reference to a value stored in a shared memory block.
+    """
+    def __init__(self, name: str, size: int, kind: str, dtype: str | None = None, shape: Tuple[int, ...] | None = None):
+        self.name = name
+        self.size = size
+        self.kind = kind
+        self.dtype = dtype
+        self.shape = shape
+
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return memoryview(value).nbytes
+    if type(value).__module__ == "numpy" and hasattr(value, "nbytes") and hasattr(value, "dtype"):
+        return int(value.nbytes)
+    return 0
+
+
+def share(value: Any, threshold: int) -> Tuple[Any, shared_memory.SharedMemory | None]:
+    """
+    Move a large buffer into shared memory.
+
+    Returns:
+        The value or its SharedBuffer reference, and the block to release
+        once the receiver is done with it.
+    """
+    size = _nbytes(value)
+    if size < threshold or size == 0:
+        return value, None
+    block = shared_memory.SharedMemory(create=True, size=size)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        block.buf[:size] = memoryview(value).cast("B")
+        return SharedBuffer(block.name, size, type(value).__name__), block
+    import numpy  # type: ignore
+
+    view = numpy.ndarray(value.shape, dtype=value.dtype, buffer=block.buf)
+    view[...] = value
+    del view
+    return SharedBuffer(block.name, size, "ndarray", str(value.dtype), tuple(value.shape)), block
+
+
+def attach(ref: SharedBuffer) -> Tuple[Any, shared_memory.SharedMemory]:
+    """
+    Map a shared buffer. Arrays are returned as views of the block, bytes
+    are copied out.
+    """
+    block = shared_memory.SharedMemory(name=ref.name)
+    if ref.kind == "ndarray":
+        import numpy  # type: ignore
+
+        return numpy.ndarray(ref.shape, dtype=ref.dtype, buffer=block.buf), block
+    data = bytes(block.buf[:ref.size])
+    return (bytearray(data) if ref.kind == "bytearray" else data), block
+
+
+def _release(block: shared_memory.SharedMemory, unlink: bool) -> None:
+    try:
+        block.close()
+    except BufferError:
+        # A view of the block is still alive; the mapping goes with the process
+        pass
+    if unlink:
+        block.unlink()
+
+
+def _compute(node: Any, inputs: Dict[str, Any]) -> Any:
+    output = node.compute(inputs)
+    if inspect.isawaitable(output):
+        return asyncio.run(output)  # type: ignore
+    return output
+
+
+def _compute_in_process(node: Any, inputs: Dict[str, Any], threshold: int) -> Any:
+    """
+    Worker entry point: map shared inputs, compute, share a large output.
+    """
+    blocks: List[shared_memory.SharedMemory] = []
+    resolved: Dict[str, Any] = {}
+    for key, value in inputs.items():
+        if isinstance(value, SharedBuffer):
+            value, block = attach(value)
+            blocks.append(block)
+        resolved[key] = value
+    output = _compute(node, resolved)
+    shared, block = share(output, threshold)
+    del resolved, output
+    for attached in blocks:
+        _release(attached, unlink=False)
+    if block is not None:
+        # The parent unlinks it after reading
+        block.close()
+    return shared
+
+
+class NodeExecutor:
+    """
+    Runs CPU-bound nodes in a process pool and the rest on threads.
+    """
+    def __init__(self, processes: int | None = None, threads: int = 8, shared_memory_threshold: int = 1 << 20):
+        """
+        Args:
+            processes: Size of the process pool; the number of CPUs when omitted.
+            threads: Size of the thread pool for I/O-bound nodes.
+            shared_memory_threshold: Buffers of at least this many bytes go through shared memory.
+        """
+        self._process_count = processes
+        self._processes: ProcessPoolExecutor | None = None
+        self._threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="giraffe-node")
+        self.shared_memory_threshold = shared_memory_threshold
+
+    def submit(self, node: Any, inputs: Dict[str, Any]) -> "Future[Any]":
+        """
+        Start computing a node.
+
+        Args:
+            node: The node to compute.
+            inputs: The outputs of its upstream nodes keyed by node id.
+        """
+        if not getattr(node, "cpu_bound", False):
+            return self._threads.submit(_compute, node, inputs)
+
+        if self._processes is None:
+            # Started on first use so thread-only graphs never fork. The
+            # resource tracker must run before the workers start so they share
+            # it and blocks created on one side and unlinked on the other are
+            # not reported as leaked.
+            resource_tracker.ensure_running()
+            self._processes = ProcessPoolExecutor(max_workers=self._process_count)
+        blocks: List[shared_memory.SharedMemory] = []
+        shared: Dict[str, Any] = {}
+        for key, value in inputs.items():
+            shared[key], block = share(value, self.shared_memory_threshold)
+            if block is not None:
+                blocks.append(block)
+        future = self._processes.submit(_compute_in_process, node, shared, self.shared_memory_threshold)
+
+        result: Future[Any] = Future()
+
+        def done(f: "Future[Any]") -> None:
+            for block in blocks:
+                _release(block, unlink=True)
+            error = f.exception()
+            if error is not None:
+                result.set_exception(error)
+                return
+            output = f.result()
+            if isinstance(output, SharedBuffer):
+                value, block = attach(output)
+                if output.kind == "ndarray":
+                    # Copy out once so the block can be released
+                    value = value.copy()
+                _release(block, unlink=True)
+                output = value
+            result.set_result(output)
+
+        future.add_done_callback(done)
+        return result
+
+    def close(self) -> None:
+        self._threads.shutdown()
+        if self._processes is not None:
+            self._processes.shutdown()
+
+    def __enter__(self) -> "NodeExecutor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
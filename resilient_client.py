@@ -0,0 +1,203 @@
+"""
+Deadline-bounded, retried and hedged chat completion requests.
+
+``ResilientClient`` wraps any client. Every call gets a deadline; attempts
+failing with a transient error (timeout, connection error, 429 or 5xx) are
+retried with jittered exponential backoff while time remains, and with
+hedging enabled a duplicate request is sent when the first one is slower
+than a percentile of recent latencies. The first good response wins.
+
+    client = ResilientClient(OpenAI(), deadline=30, retries=2, hedge=True)
+    agent = WorkflowAgentBuilder().add_llm(client, model)...
+
+A ``timeout`` passed by the caller, e.g. from a model route, overrides the
+deadline for that call. Threads cannot be cancelled, so losing hedges and
+requests past the deadline finish in the background and are discarded.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque
+
+from completions import CompletionsClient
+from log import get_logger
+from telemetry import telemetry
+
+logger = get_logger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when no attempt succeeded before the deadline.
+    """
+    pass
+
+
+# Transient errors of the OpenAI client and httpx, matched by name so neither is imported
+_TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "TimeoutException", "NetworkError", "RemoteProtocolError"}
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a request that failed with this error may succeed when retried:
+    timeouts, connection errors, rate limits (429) and server errors (5xx).
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 429) or status >= 500
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+class ResilientClient(CompletionsClient):
+    """
+    Client wrapper adding deadlines, jittered retries and hedged requests.
+    """
+    def __init__(
+        self,
+        client: Any,
+        deadline: float = 60.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        hedge: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_delay: float = 2.0,
+        hedge_min_samples: int = 20,
+        max_hedges: int = 1,
+        window: int = 200,
+        max_workers: int = 8,
+        pass_timeout: bool = True,
+        seed: int | None = None,
+        retry_on: Callable[[BaseException], bool] = is_transient,
+    ):
+        """
+        Args:
+            client: The client to send requests with.
+            deadline: Seconds a call may take including retries and hedges.
+            retries: Attempts after the first one when all requests of an attempt fail.
+            backoff: Base delay before a retry; doubled per retry with full jitter.
+            max_backoff: Upper bound of the retry delay.
+            hedge: Send a duplicate request when the first one is slow.
+            hedge_percentile: Latency percentile after which to hedge, e.g. 0.95.
+            hedge_delay: Hedge delay used until enough latencies were observed.
+            hedge_min_samples: Latencies needed before the percentile is used.
+            max_hedges: Duplicate requests per attempt.
+            window: Number of recent latencies the percentile is computed over.
+            max_workers: Threads available for in-flight requests.
+            pass_timeout: Pass the remaining time as ``timeout`` to the client.
+            seed: Seed for the jitter.
+            retry_on: Whether an error is worth retrying; other errors are raised at once.
+        """
+        super().__init__()
+        self._client = client
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.max_hedges = max_hedges
+        self.pass_timeout = pass_timeout
+        self.retry_on = retry_on
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="giraffe-llm")
+
+    def current_hedge_delay(self) -> float:
+        """
+        The delay after which a duplicate request is sent.
+        """
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return self.hedge_delay
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+
+    def create(self, **kwargs: Any) -> Any:
+        deadline = kwargs.pop("timeout", None) or self.deadline
+        expires_at = time.monotonic() + deadline
+        last_error: BaseException | None = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self._rng.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+                if time.monotonic() + delay >= expires_at:
+                    break
+                telemetry.count("llm_retries", model=kwargs.get("model", ""))
+                logger.info("retrying request in %.2fs after %r", delay, last_error)
+                time.sleep(delay)
+            try:
+                return self._attempt(kwargs, expires_at)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if not self.retry_on(e):
+                    raise
+                last_error = e
+
+        if last_error is not None and time.monotonic() < expires_at:
+            raise last_error
+        raise DeadlineExceeded(f"No response within {deadline}s") from last_error
+
+    def _attempt(self, kwargs: dict[str, Any], expires_at: float) -> Any:
+        """
+        Send a request, and hedges when enabled, returning the first success.
+        """
+        in_flight: set[Future[Any]] = {self._submit(kwargs, expires_at)}
+        hedges_left = self.max_hedges if self.hedge else 0
+        last_error: BaseException | None = None
+
+        while in_flight:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            wait_for = min(remaining, self.current_hedge_delay()) if hedges_left else remaining
+            done, in_flight = wait(in_flight, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return future.result()
+                if not self.retry_on(error):
+                    # A hedge would fail the same way
+                    raise error
+                last_error = error
+            if not done and hedges_left:
+                hedges_left -= 1
+                telemetry.count("llm_hedges", model=kwargs.get("model", ""))
+                logger.debug("hedging request to %s", kwargs.get("model"))
+                in_flight.add(self._submit(kwargs, expires_at))
+            elif not in_flight and last_error is not None:
+                raise last_error
+
+        raise DeadlineExceeded("No response before the deadline") from last_error
+
+    def _submit(self, kwargs: dict[str, Any], expires_at: float) -> Future[Any]:
+        submitted = time.monotonic()
+
+        def call() -> Any:
+            started = time.monotonic()
+            telemetry.observe("queue_wait", started - submitted, queue="llm")
+            request = dict(kwargs)
+            if self.pass_timeout:
+                request["timeout"] = max(0.0, expires_at - started)
+            response = self._client.chat.completions.create(**request)
+            with self._lock:
+                self._latencies.append(time.monotonic() - started)
+            return response
+
+        return self._executor.submit(call)
+
+    def close(self) -> None:
+        """
+        Stop the worker threads once in-flight requests are done.
+        """
+        self._executor.shutdown(wait=False)
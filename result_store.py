@@ -0,0 +1,257 @@
+"""
+Out-of-band storage for large tool and transition results.
+
+Large results are written once to local disk, keyed by their content hash,
+and the conversation only carries a compact reference with a preview. The
+model can page through a stored result with the ``read_result`` transition
+or tool, and search it with the ``find_in_result`` tool; reads go through
+mmap so only the requested slice is loaded.
+
+    with ResultStore(threshold=4000) as store:
+        agent = WorkflowAgentBuilder()...add_result_store(store).build()
+        agent.run()
+
+Without a directory the store writes to a temporary one that ``close()``
+deletes.
+"""
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any, Dict
+
+from tools import Toolbox, tool
+
+if TYPE_CHECKING:
+    from function import FunctionDefinition
+
+
+class ResultHandle:
+    """
+    Reference to a stored result. ``str()`` renders the compact form that is
+    put in the conversation.
+    """
+    def __init__(self, store: "ResultStore", handle: str, size: int, preview: str):
+        self.store = store
+        self.handle = handle
+        self.size = size
+        self.preview = preview
+
+    def read(self, offset: int = 0, length: int | None = None) -> str:
+        """
+        Read the stored result or a slice of it.
+        """
+        return self.store.read(self.handle, offset, length)
+
+    def __str__(self):
+        # Offsets are in bytes, so report where the preview ends in bytes
+        shown = len(self.preview.encode())
+        return (
+            f"[result {self.handle}: {self.size} bytes stored out of band; showing the first "
+            f"{shown} bytes. Use read_result with handle {self.handle}, a byte offset (e.g. "
+            f"{shown} to continue) and a length to read more.]\n{self.preview}"
+        )
+
+    def __repr__(self):
+        return f"ResultHandle({self.handle}, {self.size} bytes)"
+
+
+class ResultStore:
+    """
+    Content-addressed store of large results on local disk.
+    """
+    # Transitions get a fixed definition instead of one generated by the model
+    read_definition: "FunctionDefinition" = {
+        "function_name": "read_result",
+        "function_description": "Read part of a large result that was stored out of band and referenced by a handle.",
+        "argument_description": (
+            "The handle, optionally followed by a byte offset and a length separated by spaces, "
+            "e.g. 'r-0123456789abcdef 4000 4000'."
+        ),
+    }
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        threshold: int = 4000,
+        preview_chars: int = 500,
+        read_limit: int | None = None,
+    ):
+        """
+        Args:
+            directory: Where payloads are written; a temporary directory when omitted.
+            threshold: Results longer than this many characters are stored.
+            preview_chars: Characters of a stored result kept in the conversation.
+            read_limit: Maximum bytes returned by one read from the model; the
+                threshold when omitted, so reads are never stored again.
+        """
+        # Only a directory the store created is removed by close()
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="giraffe-results-")
+        os.makedirs(self.directory, exist_ok=True)
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+        self.read_limit = read_limit or threshold
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """
+        Delete the temporary directory the store created. A directory passed
+        in is left in place so its results can be reused.
+        """
+        with self._lock:
+            self._sizes.clear()
+            if self._owns_directory:
+                shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _path(self, handle: str) -> str:
+        if not re.fullmatch(r"r-[0-9a-f]{16}", handle):
+            raise ValueError(f"Invalid result handle {handle!r}")
+        return os.path.join(self.directory, handle)
+
+    def put(self, text: str) -> ResultHandle:
+        """
+        Store a result, once per distinct content.
+
+        Args:
+            text: The result to store.
+        """
+        data = text.encode()
+        handle = "r-" + hashlib.sha256(data).hexdigest()[:16]
+        with self._lock:
+            if handle not in self._sizes:
+                path = self._path(handle)
+                if not os.path.exists(path):
+                    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+                self._sizes[handle] = len(data)
+        return ResultHandle(self, handle, len(data), text[:self.preview_chars])
+
+    def compact(self, result: str) -> str:
+        """
+        The form of a result to put in the conversation: the result itself
+        when it is small, otherwise a reference with a preview.
+        """
+        if len(result) <= self.threshold:
+            return result
+        return str(self.put(result))
+
+    def size(self, handle: str) -> int:
+        """
+        Size in bytes of a stored result.
+        """
+        if handle not in self._sizes:
+            self._sizes[handle] = os.path.getsize(self._path(handle))
+        return self._sizes[handle]
+
+    def read(self, handle: str, offset: int = 0, length: int | None = None) -> str:
+        """
+        Read a slice of a stored result.
+
+        Args:
+            handle: The handle of the result.
+            offset: Byte offset to start at.
+            length: Bytes to read; to the end when omitted.
+        """
+        path = self._path(handle)
+        if not os.path.exists(path):
+            raise KeyError(f"Unknown result handle {handle}")
+        size = self.size(handle)
+        if size == 0:
+            return ""
+        offset = max(0, min(offset, size))
+        end = size if length is None else min(size, offset + max(0, length))
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Slices may split a multi-byte character
+            return mapped[offset:end].decode(errors="ignore")
+
+    def find(self, handle: str, pattern: str, context: int = 200, max_matches: int = 5) -> str:
+        """
+        Find a text in a stored result.
+
+        Args:
+            handle: The handle of the result.
+            pattern: The text to find.
+            context: Bytes of context around each match.
+            max_matches: Matches to report.
+        """
+        path = self._path(handle)
+        if not os.path.exists(path):
+            raise KeyError(f"Unknown result handle {handle}")
+        if self.size(handle) == 0 or not pattern:
+            return "No matches."
+        needle = pattern.encode()
+        matches: list[str] = []
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = mapped.find(needle)
+            while position != -1 and len(matches) < max_matches:
+                start = max(0, position - context)
+                snippet = mapped[start:position + len(needle) + context].decode(errors="ignore")
+                matches.append(f"offset {position}: ...{snippet}...")
+                position = mapped.find(needle, position + len(needle))
+        return "\n".join(matches) if matches else "No matches."
+
+    def read_transition(self, argument: str) -> str:
+        """
+        Read part of a large result stored out of band. The argument is the
+        handle followed by an optional byte offset and length, e.g. "r-0123456789abcdef 4000 4000".
+        """
+        parts = argument.split()
+        if not parts:
+            return "read_result needs a handle"
+        try:
+            offset = int(parts[1]) if len(parts) > 1 else 0
+            length = int(parts[2]) if len(parts) > 2 else self.read_limit
+        except ValueError:
+            return "read_result offset and length must be integers"
+        try:
+            return self.read(parts[0], offset, min(length, self.read_limit))
+        except (KeyError, ValueError) as e:
+            return str(e)
+
+    def retrieval_tools(self) -> Toolbox:
+        """
+        Tools letting the model page through and search stored results.
+        """
+        store = self
+
+        @tool
+        def read_result(handle: str, offset: int = 0, length: int | None = None) -> str:
+            """
+            Read part of a large result that was stored out of band.
+
+            handle: The handle of the result, e.g. r-0123456789abcdef.
+            offset: Byte offset to start reading at.
+            length: Number of bytes to read.
+            """
+            try:
+                return store.read(handle, offset, min(length or store.read_limit, store.read_limit))
+            except (KeyError, ValueError) as e:
+                return str(e)
+
+        @tool
+        def find_in_result(handle: str, pattern: str) -> str:
+            """
+            Find a text in a large result that was stored out of band.
+
+            handle: The handle of the result, e.g. r-0123456789abcdef.
+            pattern: The text to find.
+            """
+            try:
+                return store.find(handle, pattern)
+            except (KeyError, ValueError) as e:
+                return str(e)
+
+        return Toolbox().add_tool(read_result).add_tool(find_in_result)
@@ -1,9 +1,16 @@
-import json
-from typing import Any
-from openai.types.chat.chat_completion_message_tool_call import ChatCompletionMessageToolCall
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
 
 from messages import BaseMessage, SystemMessage, UserMessage
+from telemetry import telemetry
 from tools import Tool, Toolbox
+from validation import ArgumentError
+
+if TYPE_CHECKING:
+    from completion_cache import CompletionCache
+    from result_store import ResultStore
+    from openai.types.chat.chat_completion_message_tool_call import ChatCompletionMessageToolCall
 
 
 class Runner:
@@ -13,15 +20,21 @@ class Runner:
     def __init__(self):
         self.toolbox: Toolbox = Toolbox()
         self.history: list[BaseMessage] = []
+        self.result_store: ResultStore | None = None
 
-    def add_llm(self, client: Any, model: str) -> "Runner":
+    def add_llm(self, client: Any, model: str, cache: CompletionCache | None = None) -> "Runner":
         """
         Add the client and model to the runner.
 
         Args:
             client: The client to add.
             model: The model to add.
+            cache: Answer repeated identical requests from this cache.
         """
+        if cache is not None:
+            from completion_cache import CachingClient
+
+            client = CachingClient(client, cache)
         self.client = client
         self.model = model
         return self
@@ -73,18 +86,38 @@ class Runner:
         Args:
             tools: The tools to add.
         """
-        self.toolbox.tools.extend(toolbox.tools)
+        for tool in toolbox.tools:
+            self.toolbox.add_tool(tool)
         return self
     
+    def add_result_store(self, store: ResultStore) -> "Runner":
+        """
+        Keep large string results out of memory. They are returned as
+        ResultHandle objects, whose str() is a compact reference for the
+        history, and the tools to read them back are added to the toolbox.
+
+        Args:
+            store: The store to keep large results in.
+        """
+        self.result_store = store
+        return self.add_tools(store.retrieval_tools())
+
     def run(self) -> list[Any]:
       messages = [msg.dict() for msg in [self.system_message] + self.history + [self.user_message]]
-      completion = self.client.chat.completions.create(
-        model=self.model,
-        messages=messages,
-        tools=[t.schema for t in self.toolbox.tools]
-      )
+      with telemetry.span("llm.request", state="runner", model=self.model):
+        completion = self.client.chat.completions.create(
+          model=self.model,
+          messages=messages,
+          tools=[t.schema for t in self.toolbox.tools]
+        )
 
-      return self.call_tools(completion.choices[0].message.tool_calls)
+      tool_calls = completion.choices[0].message.tool_calls
+      if telemetry.enabled and completion.usage:
+        tool = ",".join(sorted(c.function.name for c in tool_calls or []))
+        telemetry.count("llm_prompt_tokens", completion.usage.prompt_tokens, state="runner", tool=tool, model=self.model)
+        telemetry.count("llm_completion_tokens", completion.usage.completion_tokens, state="runner", tool=tool, model=self.model)
+
+      return self.call_tools(tool_calls)
 
     
     def call_tools(self, tool_calls: list[ChatCompletionMessageToolCall] | None) -> list[Any]:
@@ -104,12 +137,25 @@ class Runner:
             tool_name: str | None = tool_call_func.get("name")
             function_args: str | None = tool_call_func.get("arguments")
 
-            tool = self.toolbox.get_tool(tool_name)
-
-            args: dict[str, Any] = {}
-            if function_args is not None:
-                args = json.loads(function_args)
-            
-            results.append(tool(**args))
+            try:
+                tool = self.toolbox.get_tool(tool_name)
+            except ValueError:
+                # The model asked for a tool it was not given
+                results.append(f"Error: tool {tool_name} does not exist")
+                continue
+
+            try:
+                args = tool.parse_arguments(function_args)
+            except ArgumentError as e:
+                # Hand the problem back instead of failing inside the tool
+                results.append(f"Error: invalid arguments for {tool_name}: {e}")
+                continue
+
+            with telemetry.span("tool.call", state="runner", tool=tool.name):
+                result = tool(**args)
+            store = self.result_store
+            if store is not None and isinstance(result, str) and len(result) > store.threshold:
+                result = store.put(result)
+            results.append(result)
       
         return results
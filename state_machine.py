@@ -3,6 +3,10 @@ from typing import Dict, DefaultDict
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
 
+from log import get_logger
+
+logger = get_logger(__name__)
+
 class State(BaseModel, ABC):
     """
     We define a state object which provides some utility functions for the
@@ -14,7 +18,7 @@ class State(BaseModel, ABC):
     def __init__(self, id: str):
         assert id, "State id cannot be empty"
         super().__init__(id=id)
-        print('Processing current state:', str(self))
+        logger.debug('Processing current state: %s', self)
 
     class Config:
         extra = 'allow'
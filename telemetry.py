@@ -0,0 +1,340 @@
+"""
+Tracing and metrics for agent steps, LLM requests, tool calls and graph nodes.
+
+Telemetry is disabled by default; ``span`` then hands out a shared no-op
+context manager and the counters return immediately, so instrumented code
+pays only a function call. Enable it with one or more exporters:
+
+    telemetry.enable(InMemoryExporter(), JsonlExporter("spans.jsonl"))
+    agent.run()
+    telemetry.flush()
+    print(telemetry.metrics.to_prometheus())
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from typing import IO, Any
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Span:
+    """
+    A timed operation with attributes.
+    """
+    def __init__(self, name: str, span_id: int, parent_id: int | None, attributes: dict[str, Any]):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = 0.0
+        self.error: str | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Add an attribute to the span.
+        """
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"Span({self.name}, {self.duration * 1e3:.3f}ms, {self.attributes})"
+
+
+class _NoopSpan:
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Metrics:
+    """
+    Counters and timing summaries keyed by name and labels.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.timings: dict[tuple[str, Labels], list[float]] = {}
+
+    def count(self, name: str, value: float, labels: Labels) -> None:
+        with self._lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, labels: Labels) -> None:
+        with self._lock:
+            summary = self.timings.setdefault((name, labels), [0, 0.0])
+            summary[0] += 1
+            summary[1] += seconds
+
+    def to_prometheus(self, prefix: str = "giraffe") -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        def series(name: str, labels: Labels) -> str:
+            if not labels:
+                return f"{prefix}_{name}"
+            rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            return f"{prefix}_{name}{{{rendered}}}"
+
+        lines: list[str] = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            timings = sorted(self.timings.items())
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.extend(
+                f"{series(name + '_total', labels)} {value:g}" for (n, labels), value in counters if n == name
+            )
+        for name in sorted({name for (name, _), _ in timings}):
+            lines.append(f"# TYPE {prefix}_{name}_seconds summary")
+            for (n, labels), (count, total) in timings:
+                if n == name:
+                    lines.append(f"{series(name + '_seconds_count', labels)} {count:g}")
+                    lines.append(f"{series(name + '_seconds_sum', labels)} {total:.9f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+                "timings": [
+                    {"name": name, "labels": dict(labels), "count": count, "sum": total}
+                    for (name, labels), (count, total) in self.timings.items()
+                ],
+            }
+
+
+class Exporter:
+    """
+    Receives finished spans and, on flush, the collected metrics.
+    """
+    def export_span(self, span: Span) -> None:
+        pass
+
+    def export_metrics(self, metrics: Metrics) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryExporter(Exporter):
+    """
+    Keep spans and the last metrics snapshot in memory, e.g. for tests or
+    notebooks.
+    """
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.metrics: dict[str, Any] = {}
+
+    def export_span(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def export_metrics(self, metrics: Metrics) -> None:
+        self.metrics = metrics.snapshot()
+
+
+class JsonlExporter(Exporter):
+    """
+    Append spans, and metrics snapshots on flush, to a JSONL file. Spans are
+    buffered and written to disk on flush, on close and at exit.
+    """
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        # Opened once; spans are recorded on hot paths
+        self._file: IO[str] | None = open(path, "a")
+        atexit.register(self.close)
+
+    def _write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+
+    def export_span(self, span: Span) -> None:
+        self._write({"type": "span", **span.to_dict()})
+
+    def export_metrics(self, metrics: Metrics) -> None:
+        self._write({"type": "metrics", "time": time.time(), **metrics.snapshot()})
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        """
+        Write buffered records and close the file.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        atexit.unregister(self.close)
+
+
+class PrometheusExporter(Exporter):
+    """
+    Write the metrics in Prometheus text format on flush, e.g. for the
+    node_exporter textfile collector.
+    """
+    def __init__(self, path: str):
+        self._path = path
+
+    def export_metrics(self, metrics: Metrics) -> None:
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(metrics.to_prometheus())
+        os.replace(tmp_path, self._path)
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("giraffe_span", default=None)
+
+
+class _ActiveSpan:
+    def __init__(self, telemetry: "Telemetry", name: str, attributes: dict[str, Any]):
+        self._telemetry = telemetry
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        self._span = Span(
+            self._name,
+            next(self._telemetry._ids),
+            parent.span_id if parent else None,
+            self._attributes,
+        )
+        self._token = _current_span.set(self._span)
+        self._start = time.perf_counter()
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        span = self._span
+        span.duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc is not None:
+            span.error = repr(exc)
+        self._telemetry._finish(span)
+
+
+class Telemetry:
+    """
+    Entry point for instrumentation.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.metrics = Metrics()
+        self._exporters: list[Exporter] = []
+        self._ids = itertools.count(1)
+
+    def enable(self, *exporters: Exporter) -> "Telemetry":
+        """
+        Start collecting spans and metrics.
+
+        Args:
+            exporters: The exporters receiving spans and metrics.
+        """
+        self._exporters = list(exporters)
+        self.enabled = True
+        return self
+
+    def disable(self) -> "Telemetry":
+        """
+        Stop collecting; instrumented code goes back to the no-op path.
+        """
+        self.enabled = False
+        return self
+
+    def reset(self) -> "Telemetry":
+        """
+        Drop the collected metrics.
+        """
+        self.metrics = Metrics()
+        return self
+
+    def span(self, name: str, **attributes: Any) -> Any:
+        """
+        Time a block of code, e.g. ``with telemetry.span("llm.request", model=model):``.
+        The duration is also recorded as the ``<name>`` timing summary.
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _ActiveSpan(self, name, attributes)
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        Increase a counter, e.g. tokens per state.
+        """
+        if not self.enabled:
+            return
+        self.metrics.count(name, value, _labels(labels))
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """
+        Record a timing that is not a span, e.g. the time a request waited in a queue.
+        """
+        if not self.enabled:
+            return
+        self.metrics.observe(name, seconds, _labels(labels))
+
+    def flush(self) -> None:
+        """
+        Hand the collected metrics to the exporters.
+        """
+        for exporter in self._exporters:
+            exporter.export_metrics(self.metrics)
+
+    def _finish(self, span: Span) -> None:
+        self.metrics.observe(
+            span.name.replace(".", "_"),
+            span.duration,
+            _labels({k: v for k, v in span.attributes.items() if k in _METRIC_LABELS}),
+        )
+        for exporter in self._exporters:
+            exporter.export_span(span)
+
+
+# Span attributes that are low-cardinality enough to become metric labels
+_METRIC_LABELS = {"state", "tool", "node", "model"}
+
+
+def _escape(value: str) -> str:
+    """
+    Escape a label value for the Prometheus text format; values such as the
+    tool name come from model output.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+telemetry = Telemetry()
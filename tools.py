@@ -1,6 +1,17 @@
+from __future__ import annotations
+
+import enum
+import hashlib
 import inspect
-from typing import Callable, Any, Literal, get_type_hints
-from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
+import threading
+import types
+import weakref
+from typing import TYPE_CHECKING, Callable, Any, Literal, Union, get_args, get_origin, get_type_hints
+
+from validation import ArgumentError, ArgumentValidator
+
+if TYPE_CHECKING:
+    from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
 
 class Tool:
     """
@@ -8,13 +19,60 @@ class Tool:
     """
     name: str
 
-    def __init__(self, func: Callable[..., Any], schema: ChatCompletionToolParam):
+    def __init__(self, func: Callable[..., Any], schema: ChatCompletionToolParam | None = None):
         """
-        Initialize a tool.
+        Initialize a tool. The schema is generated on first use when not given.
         """
         self.name = func.__name__
         self.func = func
-        self.schema = schema
+        self._schema = schema
+        self._validator: ArgumentValidator | None = None
+        self._converters: dict[str, Callable[[Any], Any]] = {}
+
+    @property
+    def schema(self) -> ChatCompletionToolParam:
+        """
+        The JSON schema of the tool, generated lazily so that importing modules
+        defining many tools stays fast.
+        """
+        if self._schema is None:
+            self._schema = generate_schema(self.func)
+        return self._schema
+
+    def compile_validator(self) -> ArgumentValidator:
+        """
+        Compile the argument validator from the schema. Done when the tool is
+        added to a toolbox so dispatching a call only runs the validator.
+        """
+        if self._validator is None:
+            accepts_kwargs = any(
+                p.kind == inspect.Parameter.VAR_KEYWORD for p in inspect.signature(self.func).parameters.values()
+            )
+            # OpenAI allows leaving out the parameters of a function without arguments
+            parameters = self.schema["function"].get("parameters", {"type": "object", "properties": {}})  # type: ignore
+            self._validator = ArgumentValidator(parameters, strict=not accepts_kwargs)  # type: ignore
+            self._converters = _compile_converters(self.func)
+        return self._validator
+
+    def parse_arguments(self, arguments: str | dict[str, Any] | None) -> dict[str, Any]:
+        """
+        Parse and validate the arguments of a tool call, converting values to
+        the Enum and pydantic types the function expects.
+
+        Args:
+            arguments: The JSON arguments sent by the model.
+
+        Raises:
+            ArgumentError: The arguments do not match the schema.
+        """
+        args = self.compile_validator()(arguments)
+        for name, convert in self._converters.items():
+            if args.get(name) is not None:
+                try:
+                    args[name] = convert(args[name])
+                except (ValueError, TypeError) as e:
+                    raise ArgumentError(f"argument '{name}': {e}")
+        return args
 
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
         """
@@ -37,6 +95,7 @@ class Toolbox:
         Args:
             tool: The tool to add.
         """
+        tool.compile_validator()
         self.tools.append(tool)
         return self
 
@@ -59,32 +118,273 @@ def tool(func: Callable[..., Any]) -> Tool:
     """
     Decorator to create a Tool from a function.
     """
-    schema = generate_schema(func)
-    return Tool(func, schema)
+    return Tool(func)
+
+
+_JSON_TYPES: dict[Any, str] = {
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    str: "string",
+    type(None): "null",
+}
+
+
+def infer_param_schema(annotation: Any) -> dict[str, Any]:
+    """
+    Infer the JSON schema of a Python type annotation.
+
+    Supports the scalar types, Literal, Enum, Optional and Union, lists,
+    tuples, sets, dicts and pydantic models. Anything else is described as a
+    string.
+    """
+    if annotation is Any:
+        return {}
+    if annotation in _JSON_TYPES:
+        return {"type": _JSON_TYPES[annotation]}
+    if inspect.isclass(annotation) and issubclass(annotation, enum.Enum):
+        values = [member.value for member in annotation]
+        return {**_literal_type(values), "enum": values}
+    if inspect.isclass(annotation) and hasattr(annotation, "model_json_schema"):
+        # pydantic model; checked by duck typing to keep pydantic out of the import
+        return _model_schema(annotation)
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Literal:
+        values = list(args)
+        return {**_literal_type(values), "enum": values}
+    if origin is Union or origin is types.UnionType:
+        options = [a for a in args if a is not type(None)]
+        nullable = len(options) < len(args)
+        if len(options) == 1:
+            schema = infer_param_schema(options[0])
+            if nullable and isinstance(schema.get("type"), str):
+                if "enum" in schema:
+                    # enum applies on its own, so null must be one of the values
+                    return {**schema, "type": [schema["type"], "null"], "enum": [*schema["enum"], None]}
+                return {**schema, "type": [schema["type"], "null"]}
+            return {"anyOf": [schema, {"type": "null"}]} if nullable else schema
+        return {"anyOf": [infer_param_schema(a) for a in args]}
+    if origin in (list, set, frozenset) or annotation in (list, set, frozenset):
+        schema: dict[str, Any] = {"type": "array"}
+        if args:
+            schema["items"] = infer_param_schema(args[0])
+        if origin in (set, frozenset) or annotation in (set, frozenset):
+            schema["uniqueItems"] = True
+        return schema
+    if origin is tuple or annotation is tuple:
+        if not args:
+            return {"type": "array"}
+        if len(args) == 2 and args[1] is Ellipsis:
+            return {"type": "array", "items": infer_param_schema(args[0])}
+        return {
+            "type": "array",
+            "prefixItems": [infer_param_schema(a) for a in args],
+            "minItems": len(args),
+            "maxItems": len(args),
+        }
+    if origin is dict or annotation is dict:
+        schema = {"type": "object"}
+        if len(args) == 2:
+            schema["additionalProperties"] = infer_param_schema(args[1])
+        return schema
+    return {"type": "string"}
+
+
+def _compile_converters(func: Callable[..., Any]) -> dict[str, Callable[[Any], Any]]:
+    """
+    Build converters from validated JSON values to the Enum and pydantic
+    parameter types of a function, including ones nested in containers and
+    unions.
+    """
+    converters: dict[str, Callable[[Any], Any]] = {}
+    for name, annotation in get_type_hints(func).items():
+        if name == "return":
+            continue
+        convert = _converter(annotation)
+        if convert is not None:
+            converters[name] = convert
+    return converters
+
+
+def _converter(annotation: Any) -> Callable[[Any], Any] | None:
+    """
+    The converter for values of a type, or None when the validated JSON
+    value can be passed as is.
+    """
+    if inspect.isclass(annotation) and issubclass(annotation, enum.Enum):
+        return annotation
+    if inspect.isclass(annotation) and hasattr(annotation, "model_validate"):
+        return annotation.model_validate
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Union or origin is types.UnionType:
+        options = [c for c in (_converter(a) for a in args if a is not type(None)) if c is not None]
+        if not options:
+            return None
+
+        def convert_union(value: Any) -> Any:
+            if value is None:
+                return None
+            for option in options:
+                try:
+                    return option(value)
+                except (ValueError, TypeError):
+                    pass
+            # Matches one of the options that needs no conversion
+            return value
+
+        return convert_union
+    if origin in (list, set, frozenset):
+        item = _converter(args[0]) if args else None
+        if item is None and origin is list:
+            return None
+        container = origin
+        return lambda value: container(item(v) if item else v for v in value)
+    if origin is tuple:
+        if len(args) == 2 and args[1] is Ellipsis:
+            item = _converter(args[0])
+            return lambda value: tuple(item(v) if item else v for v in value)
+        positional = [_converter(a) for a in args]
+        return lambda value: tuple(
+            positional[i](v) if i < len(positional) and positional[i] else v for i, v in enumerate(value)
+        )
+    if origin is dict and len(args) == 2:
+        item = _converter(args[1])
+        if item is None:
+            return None
+        return lambda value: {k: item(v) for k, v in value.items()}
+    return None
 
 
 def infer_param_type(annotation: Any) -> str:
     """
     Infer the JSON schema type from a Python type annotation.
     """
-    if annotation == int:
-        return "integer"
-    elif annotation == float:
-        return "number"
-    elif annotation == bool:
-        return "boolean"
-    elif annotation == str:
-        return "string"
-    else:
-        return "string"
+    param_type = infer_param_schema(annotation).get("type", "string")
+    return param_type if isinstance(param_type, str) else param_type[0]
+
+
+def _literal_type(values: list[Any]) -> dict[str, Any]:
+    types_ = {_JSON_TYPES.get(type(v)) for v in values}
+    if len(types_) == 1 and None not in types_:
+        return {"type": types_.pop()}
+    return {}
+
+
+def _model_schema(model: Any) -> dict[str, Any]:
+    schema = model.model_json_schema()
+    schema.pop("title", None)
+    return schema
+
+
+def _hoist_defs(schema: Any, defs: dict[str, Any]) -> Any:
+    """
+    Move the ``$defs`` of nested pydantic schemas into ``defs``. Their
+    ``$ref``s point to ``#/$defs/...`` at the root of the parameters.
+    """
+    if isinstance(schema, list):
+        return [_hoist_defs(item, defs) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    hoisted = {key: _hoist_defs(value, defs) for key, value in schema.items() if key != "$defs"}
+    for name, definition in schema.get("$defs", {}).items():
+        defs[name] = _hoist_defs(definition, defs)
+    return hoisted
+
+
+_schema_cache: dict[tuple[str, str, str], ChatCompletionToolParam] = {}
+_schema_cache_lock = threading.Lock()
+# Function object -> (its schema inputs, schema); skips hashing for functions seen before
+_identity_cache: weakref.WeakKeyDictionary[Any, tuple[tuple[Any, ...], ChatCompletionToolParam]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _schema_inputs(func: Callable[..., Any]) -> tuple[Any, ...]:
+    return (
+        getattr(func, "__code__", None),
+        getattr(func, "__defaults__", None),
+        getattr(func, "__kwdefaults__", None),
+        getattr(func, "__annotations__", None),
+        func.__doc__,
+    )
+
+
+def _fingerprint(func: Callable[..., Any]) -> str:
+    """
+    Hash of everything the schema is derived from: the signature, compiled
+    source, defaults, annotations and docstring.
+    """
+    code = getattr(func, "__code__", None)
+    signature = None
+    if code:
+        # Parameter names and kinds; the body alone does not depend on them
+        count = code.co_argcount + code.co_kwonlyargcount
+        count += bool(code.co_flags & inspect.CO_VARARGS) + bool(code.co_flags & inspect.CO_VARKEYWORDS)
+        signature = (
+            code.co_varnames[:count],
+            code.co_argcount,
+            code.co_posonlyargcount,
+            code.co_kwonlyargcount,
+            code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS),
+        )
+    parts = [
+        repr(signature),
+        code.co_code if code else b"",
+        repr(code.co_consts if code else None),
+        repr(getattr(func, "__defaults__", None)),
+        repr(getattr(func, "__kwdefaults__", None)),
+        repr(getattr(func, "__annotations__", None)),
+        func.__doc__ or "",
+    ]
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode())
+    return digest.hexdigest()
+
 
 def generate_schema(func: Callable[..., Any]) -> ChatCompletionToolParam:
     """
     Generate a JSON schema for a function.
 
+    Schemas are memoized by the function's module, qualified name and a hash
+    of its source, so redefining a function (e.g. in a notebook) produces a
+    fresh schema while repeated calls are a dictionary lookup. The returned
+    schema is shared and must not be mutated.
+
     Args:
         func: The function to generate a schema for.
     """
+    inputs = _schema_inputs(func)
+    try:
+        cached = _identity_cache.get(func)
+    except TypeError:
+        # Not weak-referenceable
+        cached = None
+    if cached is not None and all(a is b for a, b in zip(cached[0], inputs)):
+        return cached[1]
+
+    key = (
+        getattr(func, "__module__", "") or "",
+        getattr(func, "__qualname__", func.__name__),
+        _fingerprint(func),
+    )
+    schema = _schema_cache.get(key)
+    if schema is None:
+        schema = _generate_schema(func)
+    with _schema_cache_lock:
+        _schema_cache[key] = schema
+        try:
+            _identity_cache[func] = (inputs, schema)
+        except TypeError:
+            pass
+    return schema
+
+
+def _generate_schema(func: Callable[..., Any]) -> ChatCompletionToolParam:
     # Parse the function signature
     sig = inspect.signature(func)
     parameters = sig.parameters
@@ -98,36 +398,36 @@ def generate_schema(func: Callable[..., Any]) -> ChatCompletionToolParam:
     for line in doc_lines[1:]:
         if ":" in line:
             param, desc = line.split(":", 1)
-            if desc.strip() != "":
-                param_descriptions[param.strip()] = desc.strip()
+            if desc.strip() != "" and param.strip():
+                # "param (int): ..." describes param
+                param_descriptions[param.strip().split()[0]] = desc.strip()
 
     # Build the schema
     properties: dict[str, object] = {}
     required: list[str] = []
+    defs: dict[str, Any] = {}
     for param_name, param in parameters.items():
-        annotation = type_hints.get(param_name, str)
-        param_type = infer_param_type(type_hints.get(param_name, str))
-        property_schema: dict[str, str | list[str]] = {
-            "type": param_type,
-            "description": param_descriptions.get(param_name, "")
-        }
-        
-        if hasattr(annotation, '__origin__') and annotation.__origin__ == Literal:
-            property_schema["enum"] = list(type_hints[param_name].__args__)
+        if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        property_schema = _hoist_defs(infer_param_schema(type_hints.get(param_name, str)), defs)
+        property_schema["description"] = param_descriptions.get(param_name, "")
 
         properties[param_name] = property_schema
         if param.default == inspect.Parameter.empty:
             required.append(param_name)
 
+    parameters_schema: dict[str, Any] = {
+        "type": "object",
+        "properties": properties,
+        "required": required,
+    }
+    if defs:
+        parameters_schema["$defs"] = defs
     return {
         "type": "function",
         "function": {
             "name": func.__name__,
             "description": description,
-            "parameters": {
-                "type": "object",
-                "properties": properties,
-                "required": required,
-            },
+            "parameters": parameters_schema,
         }
     }
@@ -0,0 +1,297 @@
+"""
+Argument validators compiled from JSON schemas.
+
+A schema is turned into a tree of small closures once, so validating a tool
+call is a handful of function calls instead of a schema walk. Validators
+coerce the common near-misses of language models (numbers sent as strings,
+"true" for booleans, a single value for a one-element list) and raise an
+``ArgumentError`` whose message can be sent back to the model as is.
+"""
+import json
+from typing import Any, Callable
+
+try:
+    import orjson  # type: ignore
+
+    def loads(data: str | bytes) -> Any:
+        """
+        Parse JSON with orjson when it is installed.
+        """
+        return orjson.loads(data)
+except ImportError:
+    def loads(data: str | bytes) -> Any:
+        """
+        Parse JSON with orjson when it is installed.
+        """
+        return json.loads(data)
+
+Validator = Callable[[Any, str], Any]
+# The root $defs and the validators compiled from them, for resolving $refs
+Refs = tuple[dict[str, Any], dict[str, Validator | None]]
+
+
+class ArgumentError(ValueError):
+    """
+    Raised when arguments do not match the schema. The message is meant for
+    the model so it can correct the call.
+    """
+    pass
+
+
+def _describe(value: Any) -> str:
+    text = json.dumps(value, default=str)
+    return text if len(text) <= 60 else text[:57] + "..."
+
+
+def _where(path: str) -> str:
+    return f"argument '{path}'" if path else "arguments"
+
+
+def _validate_integer(value: Any, path: str) -> int:
+    if isinstance(value, bool):
+        raise ArgumentError(f"{_where(path)}: expected integer, got {_describe(value)}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise ArgumentError(f"{_where(path)}: expected integer, got {_describe(value)}")
+
+
+def _validate_number(value: Any, path: str) -> float | int:
+    if isinstance(value, bool):
+        raise ArgumentError(f"{_where(path)}: expected number, got {_describe(value)}")
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    raise ArgumentError(f"{_where(path)}: expected number, got {_describe(value)}")
+
+
+def _validate_boolean(value: Any, path: str) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    if value in (0, 1) and not isinstance(value, float):
+        return bool(value)
+    raise ArgumentError(f"{_where(path)}: expected boolean, got {_describe(value)}")
+
+
+def _validate_string(value: Any, path: str) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ArgumentError(f"{_where(path)}: expected string, got {_describe(value)}")
+
+
+def _validate_null(value: Any, path: str) -> None:
+    if value is None:
+        return None
+    raise ArgumentError(f"{_where(path)}: expected null, got {_describe(value)}")
+
+
+def _validate_any(value: Any, path: str) -> Any:
+    return value
+
+
+def _join(path: str, key: str | int) -> str:
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else key
+
+
+def _compile_array(schema: dict[str, Any], refs: Refs) -> Validator:
+    items = _compile(schema["items"], False, refs) if "items" in schema else _validate_any
+    prefix = [_compile(s, False, refs) for s in schema.get("prefixItems", [])]
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    unique = schema.get("uniqueItems", False)
+
+    def validate(value: Any, path: str) -> list[Any]:
+        if isinstance(value, tuple):
+            value = list(value)  # type: ignore
+        elif not isinstance(value, list):
+            if prefix:
+                raise ArgumentError(f"{_where(path)}: expected array, got {_describe(value)}")
+            # A lone value where a list is expected
+            value = [value]
+        if min_items is not None and len(value) < min_items:  # type: ignore
+            raise ArgumentError(f"{_where(path)}: expected at least {min_items} items, got {len(value)}")  # type: ignore
+        if max_items is not None and len(value) > max_items:  # type: ignore
+            raise ArgumentError(f"{_where(path)}: expected at most {max_items} items, got {len(value)}")  # type: ignore
+        result = [
+            (prefix[i] if i < len(prefix) else items)(item, _join(path, i))
+            for i, item in enumerate(value)  # type: ignore
+        ]
+        if unique and len({json.dumps(v, sort_keys=True, default=str) for v in result}) != len(result):
+            raise ArgumentError(f"{_where(path)}: items must be unique")
+        return result
+
+    return validate
+
+
+def _compile_object(schema: dict[str, Any], strict: bool, refs: Refs) -> Validator:
+    properties = {name: _compile(s, False, refs) for name, s in schema.get("properties", {}).items()}
+    required = list(schema.get("required", []))
+    additional = schema.get("additionalProperties", not strict)
+    extra: Validator | None = None
+    if isinstance(additional, dict):
+        extra = _compile(additional, False, refs)  # type: ignore
+
+    def validate(value: Any, path: str) -> dict[str, Any]:
+        if isinstance(value, str) and value.strip().startswith("{"):
+            # Nested object serialized as a string
+            try:
+                value = loads(value)
+            except ValueError:
+                pass
+        if not isinstance(value, dict):
+            raise ArgumentError(f"{_where(path)}: expected object, got {_describe(value)}")
+        missing = [name for name in required if name not in value]
+        if missing:
+            names = ", ".join(f"'{_join(path, name)}'" for name in missing)
+            raise ArgumentError(f"missing required argument{'s' if len(missing) > 1 else ''} {names}")
+        result: dict[str, Any] = {}
+        for key, item in value.items():  # type: ignore
+            validator = properties.get(key)
+            if validator is None:
+                if extra is not None:
+                    validator = extra
+                elif additional is False:
+                    allowed = ", ".join(properties) or "none"
+                    raise ArgumentError(f"unexpected argument '{_join(path, key)}'; allowed: {allowed}")
+                else:
+                    validator = _validate_any
+            result[key] = validator(item, _join(path, key))
+        return result
+
+    return validate
+
+
+def _compile_any_of(schemas: list[dict[str, Any]], refs: Refs) -> Validator:
+    options = [_compile(s, False, refs) for s in schemas]
+
+    def validate(value: Any, path: str) -> Any:
+        errors: list[str] = []
+        for option in options:
+            try:
+                return option(value, path)
+            except ArgumentError as e:
+                errors.append(str(e))
+        raise ArgumentError(f"{_where(path)}: {_describe(value)} matches none of the options ({'; '.join(errors)})")
+
+    return validate
+
+
+def _compile_enum(values: list[Any], inner: Validator) -> Validator:
+    allowed = set(json.dumps(v) for v in values)
+
+    def validate(value: Any, path: str) -> Any:
+        value = inner(value, path)
+        if json.dumps(value) not in allowed:
+            options = ", ".join(json.dumps(v) for v in values)
+            raise ArgumentError(f"{_where(path)}: {_describe(value)} is not one of {options}")
+        return value
+
+    return validate
+
+
+_TYPE_VALIDATORS: dict[str, Validator] = {
+    "integer": _validate_integer,
+    "number": _validate_number,
+    "boolean": _validate_boolean,
+    "string": _validate_string,
+    "null": _validate_null,
+}
+
+
+def compile_validator(schema: dict[str, Any], strict: bool = False) -> Validator:
+    """
+    Compile a JSON schema into a validator.
+
+    The validator takes the value and its path (used in error messages) and
+    returns the coerced value or raises ``ArgumentError``.
+
+    Args:
+        schema: The JSON schema.
+        strict: Reject object properties that are not in the schema unless
+            ``additionalProperties`` says otherwise.
+    """
+    return _compile(schema, strict, (schema.get("$defs", {}), {}))
+
+
+def _compile_ref(ref: str, refs: Refs) -> Validator:
+    defs, compiled = refs
+    name = ref.rsplit("/", 1)[-1]
+    if not ref.startswith("#/$defs/") or name not in defs:
+        return _validate_any
+    if name not in compiled:
+        # Placeholder so a recursive model refers to itself instead of recursing
+        compiled[name] = None
+        compiled[name] = _compile(defs[name], False, refs)
+    validator = compiled[name]
+    if validator is None:
+        return lambda value, path: compiled[name](value, path)  # type: ignore
+    return validator
+
+
+def _compile(schema: dict[str, Any], strict: bool, refs: Refs) -> Validator:
+    if "$ref" in schema:
+        return _compile_ref(schema["$ref"], refs)
+    if "anyOf" in schema:
+        return _compile_any_of(schema["anyOf"], refs)
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        validator = _compile_any_of(
+            [{**schema, "type": t} if t != "null" else {"type": "null"} for t in schema_type],  # type: ignore
+            refs,
+        )
+    elif schema_type == "object" or "properties" in schema:
+        validator = _compile_object(schema, strict, refs)
+    elif schema_type == "array":
+        validator = _compile_array(schema, refs)
+    else:
+        validator = _TYPE_VALIDATORS.get(schema_type, _validate_any)  # type: ignore
+
+    if "enum" in schema and not isinstance(schema_type, list):
+        validator = _compile_enum(schema["enum"], validator)
+    return validator
+
+
+class ArgumentValidator:
+    """
+    Validator for the JSON encoded arguments of a function or tool call.
+    """
+    def __init__(self, parameters: dict[str, Any], strict: bool = True):
+        """
+        Args:
+            parameters: The JSON schema of the parameters object.
+            strict: Reject arguments that are not in the schema.
+        """
+        self._validate = compile_validator(parameters, strict=strict)
+
+    def __call__(self, arguments: str | dict[str, Any] | None) -> dict[str, Any]:
+        """
+        Parse, validate and coerce the arguments.
+
+        Args:
+            arguments: The arguments as sent by the model.
+        """
+        if arguments is None or arguments == "":
+            arguments = {}
+        elif isinstance(arguments, str):
+            try:
+                arguments = loads(arguments)
+            except ValueError as e:
+                raise ArgumentError(f"arguments are not valid JSON: {e}")
+        return self._validate(arguments, "")
@@ -1,29 +1,168 @@
+from __future__ import annotations
+
+import inspect
 import json
-from typing import Dict, Callable, Any, List
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, Callable, Any, List
 
 
 from function import create_definition, FunctionDefinition
+from log import get_logger
+from telemetry import telemetry
+from validation import ArgumentError, ArgumentValidator
 
-from openai import OpenAI
-from openai.types.chat.chat_completion_message import FunctionCall
-from openai.types.chat import (
-    ChatCompletionMessageParam,
-    completion_create_params,
-    ChatCompletionMessage,
-)
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from result_store import ResultStore
+    from openai.types.chat.chat_completion_message import FunctionCall
+    from openai.types.chat import (
+        ChatCompletionMessageParam,
+        completion_create_params,
+        ChatCompletionMessage,
+    )
 
 TransitionFunction = Callable[..., str]
 FUNCTION_NAME = "ActionSelector"
 INIT = "INIT"
 _CURRENT_STEPPING_AGENT = None
 
+logger = get_logger(__name__)
+
+# Extracts the argument of a transition from the agent (e.g. its last message).
+# Returning None hands the decision back to the model.
+ArgumentRule = Callable[["WorkflowAgent"], str | None]
+
+
+class StateRoute:
+    """
+    Deterministic routing for a state, so the agent can take a transition
+    without asking the model.
+    """
+    def __init__(self, auto_advance: bool = False, argument_rules: Dict[str, ArgumentRule] | None = None):
+        """
+        Args:
+            auto_advance: Take the transition of a single-option state when its
+                argument is known from a rule or not needed.
+            argument_rules: Rules per transition name, tried in order; the first
+                one returning an argument selects its transition.
+        """
+        self.auto_advance = auto_advance
+        self.argument_rules = argument_rules or {}
+
+    def decide(self, agent: WorkflowAgent, transitions: Dict[str, TransitionFunction]) -> tuple[str, List[Any]] | None:
+        """
+        Pick the transition and its arguments, or None to let the model decide.
+        """
+        for name, rule in self.argument_rules.items():
+            if name in transitions:
+                argument = rule(agent)
+                if argument is not None:
+                    return name, [argument]
+        if self.auto_advance and len(transitions) == 1:
+            name, func = next(iter(transitions.items()))
+            if _takes_no_arguments(func):
+                return name, []
+        return None
+
+
+def _takes_no_arguments(func: TransitionFunction) -> bool:
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return all(
+        p.default is not inspect.Parameter.empty or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+        for p in parameters
+    )
+
+
+class ModelRoute:
+    """
+    The models used for the steps of a state: a primary model, a stronger
+    model to escalate to when the output is invalid and fallback models that
+    are tried in order when a request fails or times out.
+    """
+    def __init__(
+        self,
+        model: str | None = None,
+        escalate_to: str | None = None,
+        fallback_models: List[str] | None = None,
+        timeout: float | None = None,
+        transition_models: Dict[str, str] | None = None,
+    ):
+        """
+        Args:
+            model: The primary model; the agent's model when omitted.
+            escalate_to: Retry with this model when the response is not a valid action.
+            fallback_models: Models to try in order when a request raises, e.g. on timeout.
+            timeout: Seconds each request may take, passed to the client.
+            transition_models: Model for the step following a transition, by transition name.
+        """
+        self.model = model
+        self.escalate_to = escalate_to
+        self.fallback_models = fallback_models or []
+        self.timeout = timeout
+        self.transition_models = transition_models or {}
+
+
+class Attempt:
+    """
+    One request of a step to one model.
+    """
+    def __init__(self, model: str, latency: float, outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.model = model
+        self.latency = latency
+        # "ok" or the name of the exception
+        self.outcome = outcome
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    def __repr__(self):
+        return (
+            f"Attempt({self.model}, {self.outcome}, latency={self.latency * 1e3:.1f}ms, "
+            f"tokens={self.prompt_tokens}+{self.completion_tokens})"
+        )
+
+
+class StepRecord:
+    """
+    Latency and token usage of one agent step. The totals cover every
+    attempt; ``attempts`` has them per model.
+    """
+    def __init__(self, state: str):
+        self.state = state
+        # The model whose response was used
+        self.model = ""
+        self.latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.attempts: List[Attempt] = []
+        self.escalated = False
+        self.deterministic = False
+
+    def __repr__(self):
+        return (
+            f"StepRecord({self.state}, model={self.model}, latency={self.latency * 1e3:.1f}ms, "
+            f"tokens={self.prompt_tokens}+{self.completion_tokens}, attempts={len(self.attempts)})"
+        )
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
 class WorkflowAgent:
     def __init__(
         self, 
         client: OpenAI,
         model: str,
         goal: str, 
-        transitions: Dict[str, Dict[str, TransitionFunction]]
+        transitions: Dict[str, Dict[str, TransitionFunction]],
+        routes: Dict[str, StateRoute] | None = None,
+        model_routes: Dict[str | None, ModelRoute] | None = None,
+        result_store: ResultStore | None = None,
     ):
         if INIT not in transitions:
             raise Exception(f"Must define {INIT} state")
@@ -37,10 +176,35 @@ class WorkflowAgent:
         self._func_defs: Dict[TransitionFunction, FunctionDefinition] = dict()
         
         self._transitions: Dict[str, Dict[str, TransitionFunction]] = transitions
+        self._result_store = result_store
+        # Routing only considers the workflow's own transitions, not read_result
+        self._route_transitions: Dict[str, Dict[str, TransitionFunction]] = transitions
+        if result_store is not None:
+            # Stored results can be read back in every state that is not an end state
+            read = result_store.read_transition
+            self._func_defs[read] = result_store.read_definition
+            self._transitions = {
+                state: {**name_dict, "read_result": read} if name_dict else name_dict
+                for state, name_dict in transitions.items()
+            }
+        self._routes: Dict[str, StateRoute] = routes or {}
+        # Keyed by state; None holds the default for every state
+        self._model_routes: Dict[str | None, ModelRoute] = model_routes or {}
+        self._next_model: str | None = None
+        # State whose deterministic transition left it unchanged; its next step goes to the model
+        self._skip_route: str | None = None
+        self.step_records: List[StepRecord] = []
         for name_dict in self._transitions.values():
             for func in name_dict.values():
                 if func not in self._func_defs:
-                    self._func_defs[func] = create_definition(func, goal)
+                    self._func_defs[func] = create_definition(func, goal, client)
+
+        # Compiled once so every step only runs the validator
+        self._validators: Dict[str, ArgumentValidator] = {
+            state: ArgumentValidator(self.function_def_action_selector(state)["parameters"], strict=False)  # type: ignore
+            for state, name_dict in self._transitions.items()
+            if name_dict
+        }
 
     @property
     def current_state(self):
@@ -63,11 +227,16 @@ class WorkflowAgent:
         transition_func = self._transitions[self._current_state].get(function_call)
         if transition_func:
             try:
-                result = transition_func(*args)
+                with telemetry.span("tool.call", state=self._current_state, tool=function_call):
+                    result = transition_func(*args)
             except Exception as e:
                 # Function raised an exception.
                 # No state update and returning exception.
                 return str(e)
+            for route in (self._model_routes.get(self._current_state), self._model_routes.get(None)):
+                if route and function_call in route.transition_models:
+                    self._next_model = route.transition_models[function_call]
+                    break
             if self._next_state:
                 self._current_state = self._next_state
                 self._next_state = None
@@ -76,16 +245,16 @@ class WorkflowAgent:
         # State stays the same and let's just report back illegal move.
         return f"Illegal function call '{function_call}' in current state."
     
-    def function_def_action_selector(self) -> completion_create_params.Function:
+    def function_def_action_selector(self, state: str | None = None) -> completion_create_params.Function:
         actions: list[str] = []
         action_descriptions: list[str] = []
         argument_descriptions: list[str] = []
 
-        for func in self._transitions[self._current_state].values():
+        for func in self._transitions[state or self._current_state].values():
             definition = self._func_defs[func]
             actions.append(definition["function_name"])
             action_descriptions.append(
-                f"{definition["function_name"]}:{definition["function_description"]}"
+                f"{definition['function_name']}:{definition['function_description']}"
             )
             argument_descriptions.append(
                 f"For {definition['function_name']} argument: {definition['argument_description']}"
@@ -126,39 +295,197 @@ class WorkflowAgent:
                 callback(result)
         return result
 
-    def step(self):
+    def step(self) -> str:
+        state = self._current_state
+        with telemetry.span("agent.step", state=state):
+            return self._step(state)
+
+    def _step(self, state: str) -> str:
+        route = self._routes.get(state)
+        if route and self._skip_route != state:
+            decision = route.decide(self, self._route_transitions[state])
+            if decision is not None:
+                return self._step_deterministic(state, *decision)
+        self._skip_route = None
+        return self._step_llm(state)
+
+    def _step_deterministic(self, state: str, action: str, args: List[Any]) -> str:
+        """
+        Take a transition chosen by a routing rule, recording it in the
+        history as if the model had selected it.
+        """
         global _CURRENT_STEPPING_AGENT
-        response = self._client.chat.completions.create(
-            model=self._model,
-            messages=self._messages,  # type: ignore
-            functions=[self.function_def_action_selector()],
-            function_call={"name": "ActionSelector"},
-        )
-        assert response.usage, "No usage in response"
-        print("=" * 80)
-        print(
-            f"tokens: {response.usage.total_tokens} total; {response.usage.completion_tokens} completion; {response.usage.prompt_tokens} prompt"
+        record = StepRecord(state)
+        record.deterministic = True
+        self.step_records.append(record)
+        telemetry.count("deterministic_steps", state=state, tool=action)
+        logger.info("deterministic transition %s in state %s", action, state)
+        _CURRENT_STEPPING_AGENT = self # type: ignore
+        res = self.trigger(action, args)
+        _CURRENT_STEPPING_AGENT = None # type: ignore
+        if self._current_state == state:
+            # The transition failed or stayed put; taking it again would loop forever
+            self._skip_route = state
+        arguments = json.dumps({
+            "thinking": "Deterministic transition.",
+            "action": action,
+            "argument": args[0] if args else "",
+        })
+        self.add_message(
+            {"role": "assistant", "content": None, "function_call": {"name": FUNCTION_NAME, "arguments": arguments}}
         )
-        print("=" * 80)
+        self.add_message({"role": "function", "name": FUNCTION_NAME, "content": self._compact(res)})
+        return res
+
+    def _step_llm(self, state: str) -> str:
+        global _CURRENT_STEPPING_AGENT
+        record = StepRecord(state)
+        start = time.perf_counter()
+        response = self._request(state, record)
+        record.latency = time.perf_counter() - start
+        self.step_records.append(record)
         msg = response.choices[0].message
         assert msg.function_call, "No function call in response"
         _CURRENT_STEPPING_AGENT = self # type: ignore
         res = self._execute_function_call(msg.function_call)
         _CURRENT_STEPPING_AGENT = None # type: ignore
-        print(res[:120] + ("..." if len(res) > 120 else ""))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s", res[:120] + ("..." if len(res) > 120 else ""))
         self.add_message(msg)
         self.add_message(
-            {"role": "function", "name": msg.function_call.name, "content": res}
+            {"role": "function", "name": msg.function_call.name, "content": self._compact(res)}
         )
         return res
 
+    def _compact(self, result: str) -> str:
+        """
+        The content of a function message: large results are kept in the
+        result store and only referenced.
+        """
+        if self._result_store is None or not isinstance(result, str):
+            return result
+        return self._result_store.compact(result)
+
+    def _request(self, state: str, record: StepRecord) -> Any:
+        """
+        Ask the model for the next action, falling back to the next model of
+        the route when a request fails and escalating once when the answer
+        is not a valid action.
+        """
+        route = self._model_routes.get(state) or self._model_routes.get(None) or ModelRoute()
+        primary = self._next_model or route.model or self._model
+        self._next_model = None
+        candidates = [primary] + [m for m in route.fallback_models if m != primary]
+
+        for i, model in enumerate(candidates):
+            try:
+                response = self._create(state, model, route.timeout, record)
+            except Exception as e:
+                if i == len(candidates) - 1:
+                    raise
+                logger.warning("model %s failed in state %s (%r), falling back to %s", model, state, e, candidates[i + 1])
+                continue
+            if route.escalate_to and route.escalate_to != model and not self._is_valid(state, response):
+                logger.info("invalid response from %s in state %s, escalating to %s", model, state, route.escalate_to)
+                try:
+                    response = self._create(state, route.escalate_to, route.timeout, record)
+                    record.escalated = True
+                except Exception as e:
+                    logger.warning("escalation to %s failed in state %s (%r)", route.escalate_to, state, e)
+            return response
+        raise AssertionError("unreachable")
+
+    def _create(self, state: str, model: str, timeout: float | None, record: StepRecord) -> Any:
+        kwargs: Dict[str, Any] = {}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        start = time.perf_counter()
+        try:
+            with telemetry.span("llm.request", state=state, model=model):
+                response = self._client.chat.completions.create(
+                    model=model,
+                    messages=self._messages,  # type: ignore
+                    functions=[self.function_def_action_selector()],
+                    function_call={"name": "ActionSelector"},
+                    **kwargs,
+                )
+        except Exception as e:
+            record.attempts.append(Attempt(model, time.perf_counter() - start, type(e).__name__))
+            raise
+        latency = time.perf_counter() - start
+        assert response.usage, "No usage in response"
+        record.attempts.append(
+            Attempt(model, latency, "ok", response.usage.prompt_tokens, response.usage.completion_tokens)
+        )
+        record.model = model
+        record.prompt_tokens += response.usage.prompt_tokens
+        record.completion_tokens += response.usage.completion_tokens
+        if telemetry.enabled:
+            self._count_tokens(state, model, response.usage, response.choices[0].message.function_call)
+        logger.info(
+            "tokens: %d total; %d completion; %d prompt (%s)",
+            response.usage.total_tokens,
+            response.usage.completion_tokens,
+            response.usage.prompt_tokens,
+            model,
+        )
+        return response
+
+    def _is_valid(self, state: str, response: Any) -> bool:
+        function_call = response.choices[0].message.function_call
+        if function_call is None or function_call.name != FUNCTION_NAME:
+            return False
+        try:
+            self._validators[state](function_call.arguments)
+        except ArgumentError:
+            return False
+        return True
+
+    def latency_percentiles(self) -> Dict[tuple[str, str], Dict[str, float]]:
+        """
+        p50/p95 request latency, failures and mean tokens per (state, model)
+        over the recorded attempts, so an escalated step counts once for each
+        model it used.
+        """
+        groups: Dict[tuple[str, str], List[Attempt]] = {}
+        for record in self.step_records:
+            for attempt in record.attempts:
+                groups.setdefault((record.state, attempt.model), []).append(attempt)
+        return {
+            key: {
+                "count": len(attempts),
+                "errors": sum(a.outcome != "ok" for a in attempts),
+                "p50": _percentile([a.latency for a in attempts], 0.5),
+                "p95": _percentile([a.latency for a in attempts], 0.95),
+                "mean_prompt_tokens": sum(a.prompt_tokens for a in attempts) / len(attempts),
+                "mean_completion_tokens": sum(a.completion_tokens for a in attempts) / len(attempts),
+            }
+            for key, attempts in groups.items()
+        }
+
+    def _count_tokens(self, state: str, model: str, usage: Any, function_call: FunctionCall | None) -> None:
+        tool = ""
+        if function_call is not None:
+            try:
+                arguments = json.loads(function_call.arguments)
+            except ValueError:
+                arguments = None
+            if isinstance(arguments, dict):
+                tool = arguments.get("action", "")
+        telemetry.count("llm_prompt_tokens", usage.prompt_tokens, state=state, tool=tool, model=model)
+        telemetry.count("llm_completion_tokens", usage.completion_tokens, state=state, tool=tool, model=model)
+
     def _execute_function_call(self, function_call: FunctionCall) -> str:
         if function_call.name != FUNCTION_NAME:
             return f"Error: function {function_call.name} does not exist"
         
-        args = json.loads(function_call.arguments)
-        for key in args:
-            print(f'{key}: {args[key]}')
+        try:
+            args = self._validators[self._current_state](function_call.arguments)
+        except ArgumentError as e:
+            return f"Error: invalid arguments for {FUNCTION_NAME}: {e}"
+        if logger.isEnabledFor(logging.DEBUG):
+            for key in args:
+                logger.debug('%s: %s', key, args[key])
 
         action = args["action"]
         argument = args["argument"]
@@ -1,14 +1,36 @@
-from typing import Dict
-from openai import OpenAI
-from workflow_agent import TransitionFunction, WorkflowAgent, INIT
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict
+
+from workflow_agent import ArgumentRule, ModelRoute, StateRoute, TransitionFunction, WorkflowAgent, INIT
+
+if TYPE_CHECKING:
+    from completion_cache import CompletionCache
+    from openai import OpenAI
+    from result_store import ResultStore
 
 
 class WorkflowAgentBuilder:
     def __init__(self):
         self._system_message = ""
         self._transitions: Dict[str, Dict[str, TransitionFunction]] = dict()
+        self._routes: Dict[str, StateRoute] = dict()
+        self._model_routes: Dict[str | None, ModelRoute] = dict()
+        self._result_store: ResultStore | None = None
 
-    def add_llm(self, client: OpenAI, model: str):
+    def add_llm(self, client: OpenAI, model: str, cache: CompletionCache | None = None):
+        """
+        Set the client and model of the agent.
+
+        Args:
+            client: The client to use.
+            model: The model to use.
+            cache: Answer repeated identical requests from this cache.
+        """
+        if cache is not None:
+            from completion_cache import CachingClient
+
+            client = CachingClient(client, cache)
         self._client = client
         self._model = model
         return self
@@ -17,12 +39,87 @@ class WorkflowAgentBuilder:
         self._system_message = message
         return self
 
-    def add_state_and_transitions(self, state_name: str, transition_functions: set[TransitionFunction]):
+    def add_state_and_transitions(
+        self,
+        state_name: str,
+        transition_functions: set[TransitionFunction],
+        auto_advance: bool = False,
+        argument_rules: Dict[str | TransitionFunction, ArgumentRule] | None = None,
+    ):
+        """
+        Add a state and the functions that can be called in it.
+
+        Args:
+            state_name: The name of the state.
+            transition_functions: The functions the model can choose from.
+            auto_advance: Skip the model when there is a single function whose
+                argument is known from a rule or not needed.
+            argument_rules: Rules per function (or function name) that extract the
+                argument from the agent; a rule returning a value takes that
+                transition without calling the model, None falls back to it.
+        """
         if state_name in self._transitions:
             raise Exception(f"State {state_name} transition already defined")
         self._transitions[state_name] = {
             func.__name__: func for func in transition_functions
         }
+        if auto_advance or argument_rules:
+            rules = {
+                (func if isinstance(func, str) else func.__name__): rule
+                for func, rule in (argument_rules or {}).items()
+            }
+            for name in rules:
+                if name not in self._transitions[state_name]:
+                    raise Exception(f"Argument rule for unknown transition {name} in state {state_name}")
+            self._routes[state_name] = StateRoute(auto_advance=auto_advance, argument_rules=rules)
+        return self
+
+    def add_model_route(
+        self,
+        state_name: str | None = None,
+        model: str | None = None,
+        escalate_to: str | None = None,
+        fallback_models: list[str] | None = None,
+        timeout: float | None = None,
+        transition_models: Dict[str | TransitionFunction, str] | None = None,
+    ):
+        """
+        Choose the models used in a state, or in every state without its own
+        route when state_name is None. The model given to add_llm is the
+        default tier.
+
+        Args:
+            state_name: The state, or None for the default route.
+            model: The primary model of the state.
+            escalate_to: Retry with this model when the response is not a valid action.
+            fallback_models: Models to try in order when a request fails or times out.
+            timeout: Seconds each request may take.
+            transition_models: Model for the step following a transition, by function or name.
+        """
+        if state_name in self._model_routes:
+            raise Exception(f"Model route for state {state_name} already defined")
+        self._model_routes[state_name] = ModelRoute(
+            model=model,
+            escalate_to=escalate_to,
+            fallback_models=fallback_models,
+            timeout=timeout,
+            transition_models={
+                (func if isinstance(func, str) else func.__name__): m
+                for func, m in (transition_models or {}).items()
+            },
+        )
+        return self
+
+    def add_result_store(self, store: ResultStore):
+        """
+        Keep large transition results out of the conversation. The model sees
+        a handle with a preview and gets a read_result transition in every
+        state to page through them.
+
+        Args:
+            store: The store to keep large results in.
+        """
+        self._result_store = store
         return self
 
     def add_end_state(self, state_name: str):
@@ -43,5 +140,8 @@ class WorkflowAgentBuilder:
             client=self._client,
             model=self._model,
             goal=self._system_message, 
-            transitions=self._transitions
+            transitions=self._transitions,
+            routes=self._routes,
+            model_routes=self._model_routes,
+            result_store=self._result_store,
         )
\ No newline at end of file